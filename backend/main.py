@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List , Optional
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import os
 import uuid
 from sqlalchemy.orm import Session
@@ -38,6 +39,7 @@ class Tool(BaseModel):
 
 class Query(BaseModel):
     text: str
+    stream: bool = False
 
 class ChatCreate(BaseModel):
     title: str
@@ -500,6 +502,25 @@ async def process_query(chat_id: str, query: Query, db: Session = Depends(db.get
 
     print(file_urls[0])
 
+    if query.stream:
+        # Relay the microservice's NDJSON event stream as it is produced
+        def relay():
+            try:
+                with requests.post(
+                    url = f"{url}/stream",
+                    data=json.dumps({"query": query.text , "url" : file_urls[0]}),
+                    headers=_get_request_headers(),
+                    stream=True,
+                    timeout=900
+                ) as response:
+                    for line in response.iter_lines():
+                        if line:
+                            yield line + b"\n"
+            except Exception as e:
+                yield (json.dumps({"type": "error", "error": str(e)}) + "\n").encode()
+
+        return StreamingResponse(relay(), media_type="application/x-ndjson")
+
     try:
         response = requests.post(
             url = url,
@@ -530,16 +551,37 @@ async def upload_file(
         
         # Upload to S3 and get URL
         file_url = upload_file_to_s3(file_content, unique_filename)
+
+        # Start ingesting the document so the first query finds it indexed
+        ingestion = None
+        try:
+            response = requests.post(
+                url=f"{backend_url}/ingest",
+                data=json.dumps({"url": file_url}),
+                headers=_get_request_headers(),
+                timeout=30
+            )
+            ingestion = response.json()
+        except Exception as e:
+            print(e)
         
         return {
             "filename": unique_filename,
             "file_url": file_url,
             "original_filename": file.filename,
+            "ingestion": ingestion,
             "message": "File uploaded successfully"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/chats/{chat_id}/ingestion/{job_id}")
+async def get_ingestion_status(chat_id: str, job_id: str):
+    try:
+        response = requests.get(url=f"{backend_url}/ingest/{job_id}", timeout=900)
+        return response.json()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,149 +1,254 @@
-from flask import Flask, jsonify, request
-from rag_agent.supervisor import SUPERVISOR_AGENT
-from rag_agent.default_tools import TOOLS, TOOLS_AUX, TOOL_MAP
-from rag_agent.utils import chat_llm
-import nltk
-import dill as pickle
-import os
-from io import BytesIO
-import requests
-from flask_cors import CORS
-import fitz
-from copy import deepcopy
-
-# nltk.download('punkt_tab')
-
-class_supervisors = {}
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
-
-
-@app.route('/<string:id>/<string:chat_id>/query', methods=['POST'])
-def query(id, chat_id):
-    #POST request with{
-    #   'url' : '',
-    #   'query' : ''
-    # }
-    data = request.get_json()
-    
-    if class_supervisors.get(id, None) == None:
-        class_supervisors[id] = []
-    
-    supervisor = next((obj for obj in class_supervisors[id] if obj.chat_id == chat_id), None)
-    
-    if supervisor == None:
-        supervisor = SUPERVISOR_AGENT(deepcopy(TOOLS), deepcopy(TOOLS_AUX), chat_llm, deepcopy(TOOL_MAP), data["url"], chat_id)
-        if class_supervisors.get(id, None) == None:
-            class_supervisors[id] = []    
-        class_supervisors[id].append(supervisor)
-        output = supervisor.run(data["query"])
-        
-        return jsonify({ "response" : output }) 
-    
-    
-    output = supervisor.run(data["query"], True)
-    
-    return jsonify({ "response" : output })
-
-@app.route('/<string:id>/<string:chat_id>/get_conversations', methods=['GET'])
-def get_conversations(id, chat_id):
-    #GET request with{
-    #   'url' : ''
-    # }
-    # data = request.get_json()
-    
-    if class_supervisors.get(id, None) == None:
-        class_supervisors[id] = []
-    
-    supervisor = next((obj for obj in class_supervisors[id] if obj.chat_id == chat_id), None)
-
-    if supervisor == None : 
-        return jsonify({ "conversations" : [] })
-
-    conversations = supervisor.logs
-    
-    return jsonify({ "conversations" : conversations })
-
-@app.route('/<string:id>/<string:chat_id>/add_tool', methods=['POST'])
-def add_tools(id, chat_id):
-    #POST request with{
-    #   'url' : '',
-    #   'query' : '',
-    #   'user_code' : ''
-    # }
-    
-    data = request.get_json()
-    
-    if class_supervisors.get(id, None) == None:
-        return jsonify({ "response" : "ID not found" })
-    supervisor = next((obj for obj in class_supervisors[id] if obj.chat_id == chat_id), None)
-    res = supervisor.add_tool(data["user_code"])
-    
-    return jsonify(res) 
-    
-@app.route('/<string:id>/<string:chat_id>/add_tool_desc', methods=['POST'])
-def add_tools_desc(id, chat_id):
-    #POST request with{
-    #   'url' : '',
-    #   'user_desc' : '',
-    #   'func_name' : '',
-    #   'query' : '',
-    # }
-    data = request.get_json()
-    
-    if class_supervisors.get(id, None) == None:
-        return jsonify({ "response" : "ID not found" , "error" : True})
-    
-    supervisor = next((obj for obj in class_supervisors[id] if obj.chat_id == chat_id), None)
-    
-    res = supervisor.add_desc(data["user_desc"], data["func_name"])
-    
-    if res["error"] != "NAME_INVALID":
-        return jsonify({ "response" : "Success" , "error" : False})
-    return jsonify({ "response" : res["error"] , "error" : True})
-    
-@app.route('/<string:id>/<string:chat_id>/clarify_rag', methods=['POST'])
-def clarify_rag(id, chat_id):
-    #POST request with{
-    #   'url' : '',
-    #   're_evaluate' : '',
-    #   'clarification' : '',
-    #   'feedback' : '',
-    #   'query' : ''
-    # }
-    data = request.get_json()
-    if class_supervisors.get(id, None) == None:
-        return jsonify({ "response" : "ID not found" })
-    supervisor = next((obj for obj in class_supervisors[id] if obj.chat_id == chat_id), None)
-    
-    if data["re_evaluate"] == True:
-        output = supervisor.resolve_rag_jargon(data["clarification"], data["feedback"])
-        if output["CODE_REFLEXTION_FLAG"] == False:
-            return jsonify({"response" : output})
-        output = supervisor.run(data["query"])
-        return jsonify({ "response" : output }) 
-    else : 
-        output= supervisor.resolve_rag_flag()
-        output = supervisor.run(data["query"])
-        return jsonify({ "response" : output })
-       
-@app.route('/<string:id>/get_history', methods=['GET'])
-def get_history(id):
-    history = []
-    
-    if class_supervisors.get(id, None) == None:
-        return jsonify({ "history" : history })
-    
-    for obj in class_supervisors[id]:
-        history.append([
-                {
-                    "chat_id" : obj.chat_id, 
-                    "pdf_title" : obj.pdf_title, 
-                    "url" : obj.url
-                }
-            ])
-    
-    return jsonify({ "history" : history })
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+from fastapi import FastAPI, Body
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from rag_agent.session_manager import session_manager
+from rag_agent.session_store import InvalidSessionKey, SessionConflict
+from rag_agent.ingestion import ingestion_pipeline
+from rag_agent.utils import WEB_WORKERS, llm_cache, embedding_cache
+from rag_agent.vector_index import index_stats
+import nltk
+import dill as pickle
+import os
+import json
+from io import BytesIO
+import requests
+import fitz
+import asyncio
+from contextlib import asynccontextmanager
+import atexit
+import uvicorn
+
+# nltk.download('punkt_tab')
+
+chat_locks = {}
+app = FastAPI()
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.exception_handler(SessionConflict)
+async def session_conflict(request, e):
+    return JSONResponse({ "response" : str(e), "error" : True }, status_code=409)
+
+@app.exception_handler(InvalidSessionKey)
+async def invalid_session_key(request, e):
+    return JSONResponse({ "response" : str(e), "error" : True }, status_code=400)
+
+@asynccontextmanager
+async def chat_lock(id, chat_id):
+    # A supervisor is not safe to run concurrently, so requests of one chat are serialized for
+    # the whole request: in this worker on an asyncio lock, so waiting requests don't hold
+    # threads, and across workers on the session store's lock. chat_locks maps a chat to its
+    # lock and the number of requests using it, and the entry goes away with the last one
+    key = (id, chat_id)
+    entry = chat_locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            acquire = asyncio.ensure_future(asyncio.to_thread(session_manager.store.acquire_lock, id, chat_id))
+            try:
+                token = await asyncio.shield(acquire)
+            except asyncio.CancelledError:
+                # The store lock is still taken by the worker thread: release it once it is
+                acquire.add_done_callback(lambda done: done.exception() is None and session_manager.store.release_lock(id, chat_id, done.result()))
+                raise
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(session_manager.store.release_lock, id, chat_id, token)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            chat_locks.pop(key, None)
+
+@asynccontextmanager
+async def chat_session(id, chat_id, url=None, write=True):
+    # Yields the chat's supervisor (None if the chat has no session and no url is given) and
+    # whether it was just created, pinned in memory for the duration of the request. Unless
+    # write is False, the session is saved to the shared store afterwards
+    supervisor, created = await asyncio.to_thread(session_manager.acquire, id, chat_id, url)
+    try:
+        yield supervisor, created
+    finally:
+        await asyncio.to_thread(session_manager.release, id, chat_id, write)
+
+atexit.register(session_manager.persist_all)
+
+
+@app.post('/ingest')
+def ingest(data: dict = Body(...)):
+    #POST request with{
+    #   'url' : '',
+    #   'raptor' : true (optional)
+    # }
+    job = ingestion_pipeline.submit(data["url"], data.get("raptor", True))
+    
+    return job.to_dict()
+
+@app.get('/llm_cache/stats')
+def llm_cache_stats():
+    # Hits, misses and hit rate of every cached LLM call site of this worker
+    return llm_cache.stats()
+
+@app.get('/embedding_cache/stats')
+def embedding_cache_stats():
+    # Hits, disk hits, misses, evictions and sizes of the embedding cache of this worker
+    return embedding_cache.stats()
+
+@app.get('/index/stats')
+def vector_index_stats():
+    # Kind, size, build time and recall of the latest vector indices built by this worker
+    return index_stats()
+
+@app.get('/ingest/{job_id}')
+def ingest_status(job_id: str):
+    job = ingestion_pipeline.get_job(job_id)
+    
+    if job == None:
+        return JSONResponse({ "response" : "Job not found", "error" : True }, status_code=404)
+    
+    return job.to_dict()
+
+@app.post('/{id}/{chat_id}/query')
+async def query(id: str, chat_id: str, data: dict = Body(...)):
+    #POST request with{
+    #   'url' : '',
+    #   'query' : ''
+    # }
+    async with chat_lock(id, chat_id), chat_session(id, chat_id, data["url"]) as (supervisor, created):
+        output = await supervisor.arun(data["query"], not created)
+        
+        return { "response" : output }
+
+@app.post('/{id}/{chat_id}/query/stream')
+async def query_stream(id: str, chat_id: str, data: dict = Body(...)):
+    #POST request with{
+    #   'url' : '',
+    #   'query' : ''
+    # }
+    # Streams newline delimited JSON events: thought, tool_call, observation, reasoning and
+    # token events as the agents produce them, then a final event with the same
+    # "response" as /query (or an error event).
+    events = asyncio.Queue()
+    
+    async def produce():
+        # The lock is taken inside the try, so a rejected key or a failed or cancelled lock
+        # still ends the stream with an error event and the sentinel
+        try:
+            async with chat_lock(id, chat_id), chat_session(id, chat_id, data["url"]) as (supervisor, created):
+                supervisor.event_sink = events.put_nowait
+                try:
+                    output = await supervisor.arun(data["query"], not created)
+                finally:
+                    supervisor.event_sink = None
+            events.put_nowait({ "type" : "final", "response" : output })
+        except Exception as e:
+            events.put_nowait({ "type" : "error", "error" : str(e) })
+        finally:
+            events.put_nowait(None)
+    
+    async def stream():
+        task = asyncio.create_task(produce())
+        while True:
+            event = await events.get()
+            if event == None:
+                break
+            yield json.dumps(event, default=str) + "\n"
+        await task
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get('/{id}/{chat_id}/get_conversations')
+async def get_conversations(id: str, chat_id: str):
+    #GET request with{
+    #   'url' : ''
+    # }
+    
+    async with chat_session(id, chat_id, write=False) as (supervisor, created):
+        if supervisor == None : 
+            return { "conversations" : [] }
+
+        conversations = supervisor.logs
+    
+    return { "conversations" : conversations }
+
+@app.post('/{id}/{chat_id}/add_tool')
+async def add_tools(id: str, chat_id: str, data: dict = Body(...)):
+    #POST request with{
+    #   'url' : '',
+    #   'query' : '',
+    #   'user_code' : ''
+    # }
+    
+    async with chat_lock(id, chat_id), chat_session(id, chat_id) as (supervisor, created):
+        if supervisor == None:
+            return { "response" : "ID not found" }
+        res = await asyncio.to_thread(supervisor.add_tool, data["user_code"])
+    
+    return res
+    
+@app.post('/{id}/{chat_id}/add_tool_desc')
+async def add_tools_desc(id: str, chat_id: str, data: dict = Body(...)):
+    #POST request with{
+    #   'url' : '',
+    #   'user_desc' : '',
+    #   'func_name' : '',
+    #   'query' : '',
+    # }
+    
+    async with chat_lock(id, chat_id), chat_session(id, chat_id) as (supervisor, created):
+        if supervisor == None:
+            return { "response" : "ID not found" , "error" : True}
+        
+        res = await asyncio.to_thread(supervisor.add_desc, data["user_desc"], data["func_name"])
+    
+    if res["error"] != "NAME_INVALID":
+        return { "response" : "Success" , "error" : False}
+    return { "response" : res["error"] , "error" : True}
+    
+@app.post('/{id}/{chat_id}/clarify_rag')
+async def clarify_rag(id: str, chat_id: str, data: dict = Body(...)):
+    #POST request with{
+    #   'url' : '',
+    #   're_evaluate' : '',
+    #   'clarification' : '',
+    #   'feedback' : '',
+    #   'query' : ''
+    # }
+    async with chat_lock(id, chat_id), chat_session(id, chat_id) as (supervisor, created):
+        if supervisor == None:
+            return { "response" : "ID not found" }
+        if data["re_evaluate"] == True:
+            output = await asyncio.to_thread(supervisor.resolve_rag_jargon, data["clarification"], data["feedback"])
+            if output["CODE_REFLEXTION_FLAG"] == False:
+                return {"response" : output}
+            output = await supervisor.arun(data["query"])
+            return { "response" : output }
+        else : 
+            output = await asyncio.to_thread(supervisor.resolve_rag_flag)
+            output = await supervisor.arun(data["query"])
+            return { "response" : output }
+       
+@app.get('/{id}/get_history')
+def get_history(id: str):
+    history = []
+    
+    # Includes the chats whose sessions were spilled to disk
+    for chat in session_manager.history(id):
+        history.append([
+                {
+                    "chat_id" : chat["chat_id"], 
+                    "pdf_title" : chat["pdf_title"], 
+                    "url" : chat["url"]
+                }
+            ])
+    
+    return { "history" : history }
+
+if __name__ == '__main__':
+    # Sessions are shared through the session store, so any worker can serve any chat
+    uvicorn.run('main:app', host='0.0.0.0', port=5000, workers=WEB_WORKERS)
\ No newline at end of file
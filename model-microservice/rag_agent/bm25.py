@@ -0,0 +1,103 @@
+import re
+from typing import List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+# Words, numbers and dotted or hyphenated codes: keeps tickers ("brk.b"), fiscal years
+# ("fy2022"), amounts ("10.5") and filing names ("10-k") as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase BM25 tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over a small collection of texts, e.g. the pages of a PDF.
+
+    The index is a `scipy.sparse` CSR matrix of BM25 term weights with one row per term
+    and one column per text. The weights are computed once at build time, so scoring a
+    query is the sum of the rows of its terms.
+
+    Args:
+        texts (Sequence[str]): The texts to index.
+        k1 (float, optional): Term frequency saturation. Defaults to 1.5.
+        b (float, optional): Length normalization. Defaults to 0.75.
+    """
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+
+        term_ids, text_ids = [], []
+        for text_id, text in enumerate(texts):
+            for token in tokenize(text or ""):
+                term_ids.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+                text_ids.append(text_id)
+
+        counts = sparse.csr_matrix(
+            (np.ones(len(term_ids), dtype=np.float32), (term_ids, text_ids)),
+            shape=(len(self.vocabulary), len(texts)),
+        )
+        counts.sum_duplicates()
+
+        lengths = np.asarray(counts.sum(axis=0), dtype=np.float32).ravel()
+        average_length = lengths.mean() if len(texts) and lengths.mean() > 0 else 1.0
+        document_frequency = np.diff(counts.indptr).astype(np.float32)
+        idf = np.log1p((len(texts) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        term_of_entry = np.repeat(np.arange(len(self.vocabulary)), np.diff(counts.indptr))
+        norm = k1 * (1 - b + b * lengths[counts.indices] / average_length)
+        counts.data = idf[term_of_entry] * counts.data * (k1 + 1) / (counts.data + norm)
+        self.weights = counts
+        self.size = len(texts)
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        Return the BM25 score of every text for a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            np.ndarray: float32 vector with one score per text, 0 for texts sharing no term with the query.
+        """
+        term_ids = [self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary]
+        if not term_ids:
+            return np.zeros(self.size, dtype=np.float32)
+        return np.asarray(self.weights[term_ids].sum(axis=0), dtype=np.float32).ravel()
+
+    def ranking(self, query: str) -> np.ndarray:
+        """
+        Return the ids of the texts matching a query, best first.
+        """
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores > 0)
+        return matching[np.argsort(-scores[matching], kind="stable")]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], size: int, k: int = 60) -> np.ndarray:
+    """
+    Fuse rankings of the same collection by reciprocal rank: every ranking adds
+    `1 / (k + rank)` to the score of each id it ranks, with ranks starting at 1.
+
+    Args:
+        rankings (Sequence[np.ndarray]): Rankings to fuse, each an array of ids, best first.
+                                         A ranking may leave ids out.
+        size (int): Number of ids in the collection.
+        k (int, optional): Rank offset damping the weight of the top ranks. Defaults to 60.
+
+    Returns:
+        np.ndarray: float vector with the fused score of every id.
+    """
+    fused = np.zeros(size, dtype=np.float64)
+    for ranking in rankings:
+        ranking = np.asarray(ranking, dtype=np.int64)
+        fused[ranking] += 1.0 / (k + np.arange(1, len(ranking) + 1))
+    return fused
@@ -0,0 +1,321 @@
+import json
+import os
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+
+class EmbeddingMatrix:
+    """
+    Growable, contiguous matrix of embedding vectors.
+
+    Rows are stored in a single preallocated array that doubles in capacity when full,
+    instead of one `np.ndarray` object per vector. Vectors can optionally be quantized
+    on insert to float16, or to int8 with one float32 scale per row.
+
+    Args:
+        dim (int): Dimensionality of the vectors.
+        dtype (str, optional): Storage type, one of 'float32', 'float16' or 'int8'.
+                               Defaults to 'float32'.
+    """
+
+    DTYPES = ("float32", "float16", "int8")
+
+    def __init__(self, dim: int, dtype: str = "float32"):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported storage dtype '{dtype}'. Expected one of {self.DTYPES}")
+        self.dim = dim
+        self.dtype = dtype
+        self.count = 0
+        self.data = np.zeros((0, dim), dtype=dtype)
+        self.scales = np.zeros(0, dtype="float32")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, row: int) -> np.ndarray:
+        if row < 0 or row >= self.count:
+            raise IndexError(row)
+        return self.rows([row])[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.scales.nbytes
+
+    def append(self, vector) -> int:
+        """
+        Append a vector and return its row number.
+        """
+        vector = np.asarray(vector, dtype="float32")
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Embedding dimension mismatch. Expected {self.dim}, got {vector.shape[0]}")
+
+        if self.count == self.data.shape[0]:
+            self._grow(max(16, 2 * self.count))
+
+        if self.dtype == "int8":
+            scale = float(np.abs(vector).max()) / 127.0 or 1.0
+            self.data[self.count] = np.round(vector / scale).astype("int8")
+            self.scales[self.count] = scale
+        else:
+            self.data[self.count] = vector
+        self.count += 1
+        return self.count - 1
+
+    def rows(self, rows) -> np.ndarray:
+        """
+        Return the given rows as a float32 matrix.
+        """
+        selected = self.data[rows].astype("float32")
+        if self.dtype == "int8":
+            selected *= self.scales[rows][:, None]
+        return selected
+
+    def matrix(self) -> np.ndarray:
+        """
+        Return every stored row as a float32 matrix (a view when stored as float32).
+        """
+        if self.dtype == "float32":
+            return self.data[:self.count]
+        return self.rows(slice(0, self.count))
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """
+        Compute the dot product of every stored row with `vector`.
+        """
+        scores = self.data[:self.count] @ np.asarray(vector, dtype="float32")
+        if self.dtype == "int8":
+            scores = scores * self.scales[:self.count]
+        return scores.astype("float32", copy=False)
+
+    def save(self, path: str) -> None:
+        """
+        Write the stored rows to `path` (and the int8 scales to `<path>.scales`) in .npy format.
+        """
+        with open(path, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.data[:self.count]))
+        if self.dtype == "int8":
+            with open(f"{path}.scales", "wb") as f:
+                np.save(f, self.scales[:self.count])
+
+    @classmethod
+    def load(cls, path: str, dim: int, dtype: str) -> "EmbeddingMatrix":
+        """
+        Load a matrix written by `save`.
+
+        The rows are memory-mapped read-only, so loading does not copy them. The first
+        `append` after loading copies them into a regular, growable array.
+        """
+        matrix = cls(dim, dtype)
+        matrix.data = np.load(path, mmap_mode="r")
+        matrix.count = matrix.data.shape[0]
+        if dtype == "int8":
+            matrix.scales = np.load(f"{path}.scales", mmap_mode="r")
+        return matrix
+
+    def _grow(self, capacity: int) -> None:
+        data = np.zeros((capacity, self.dim), dtype=self.dtype)
+        data[:self.count] = self.data[:self.count]
+        self.data = data
+        if self.dtype == "int8":
+            scales = np.zeros(capacity, dtype="float32")
+            scales[:self.count] = self.scales[:self.count]
+            self.scales = scales
+
+
+class TextPool:
+    """
+    Interns strings, so every distinct text is stored once and referenced by an integer id.
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, text_id: int) -> str:
+        return self.texts[text_id]
+
+    def intern(self, text) -> int:
+        text = str(text)
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = len(self.texts)
+            self.texts.append(text)
+            self._ids[text] = text_id
+        return text_id
+
+
+class CacheRecord(Mapping):
+    """
+    Read-only, dict-like view of one row of a `CacheMetadata` store.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "CacheMetadata", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, key):
+        return self._store.get_field(self._row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.fields(self._row))
+
+    def __len__(self) -> int:
+        return len(self._store.fields(self._row))
+
+    def __repr__(self) -> str:
+        return f"CacheRecord({dict(self)!r})"
+
+
+class CacheMetadata(Mapping):
+    """
+    Columnar metadata store of a `DynamicCacheIndex`, mapping chunk ids to `CacheRecord`s.
+
+    Every text field (query, original query, query type, chunk and summarized chunk)
+    is interned in a shared `TextPool` and stored as an integer id, and timestamps are
+    stored as epoch seconds, so a chunk reused by several utility queries is held once.
+    Keys outside the known columns are kept in a per-row dict.
+    """
+
+    TEXT_FIELDS = ("query", "query_type", "original_query", "chunk", "summarized_chunk_text")
+
+    def __init__(self):
+        self.texts = TextPool()
+        self.columns = {field: array("i") for field in self.TEXT_FIELDS}
+        self.chunk_index = array("i")
+        self.timestamp = array("d")
+        self.extra: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, row: int) -> CacheRecord:
+        if not isinstance(row, (int, np.integer)) or row < 0 or row >= len(self):
+            raise KeyError(row)
+        return CacheRecord(self, int(row))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        column_bytes = sum(column.itemsize * len(column) for column in self.columns.values())
+        text_bytes = sum(len(text) for text in self.texts.texts)
+        return column_bytes + text_bytes + len(self.chunk_index) * 4 + len(self.timestamp) * 8
+
+    def append(self, metadata: Dict) -> int:
+        """
+        Append the metadata of a chunk and return its row (the chunk id).
+        """
+        metadata = dict(metadata)
+        row = len(self)
+
+        for field in self.TEXT_FIELDS:
+            value = metadata.pop(field, None)
+            self.columns[field].append(-1 if value is None else self.texts.intern(value))
+
+        chunk_index = metadata.pop("chunk_index", None)
+        if isinstance(chunk_index, int) and chunk_index >= 0:
+            self.chunk_index.append(chunk_index)
+        else:
+            self.chunk_index.append(-1)
+            if chunk_index is not None:
+                metadata["chunk_index"] = chunk_index
+
+        timestamp = metadata.pop("timestamp", None)
+        self.timestamp.append(self._parse_timestamp(timestamp))
+        if timestamp is not None and self.timestamp[row] < 0:
+            metadata["timestamp"] = timestamp
+
+        if metadata:
+            self.extra[row] = metadata
+        return row
+
+    def fields(self, row: int) -> List[str]:
+        """Return the keys present on a row."""
+        keys = [field for field in self.TEXT_FIELDS if self.columns[field][row] >= 0]
+        if self.chunk_index[row] >= 0:
+            keys.append("chunk_index")
+        if self.timestamp[row] >= 0:
+            keys.append("timestamp")
+        keys.extend(self.extra.get(row, {}).keys())
+        return keys
+
+    def get_field(self, row: int, key: str):
+        """Return one field of a row, raising KeyError if it is not set."""
+        if key in self.columns:
+            text_id = self.columns[key][row]
+            if text_id >= 0:
+                return self.texts[text_id]
+        elif key == "chunk_index" and self.chunk_index[row] >= 0:
+            return self.chunk_index[row]
+        elif key == "timestamp" and self.timestamp[row] >= 0:
+            return datetime.fromtimestamp(self.timestamp[row]).isoformat()
+        extra = self.extra.get(row)
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def save(self, path: str) -> None:
+        """
+        Write the store to `path` as two Arrow IPC files: `<path>` holds one row per chunk
+        (text ids, chunk_index, timestamp and the JSON encoded extra keys) and
+        `<path>.texts` holds the interned text pool.
+        """
+        extra = [
+            json.dumps(self.extra[row], default=str) if row in self.extra else None
+            for row in range(len(self))
+        ]
+        columns = {field: pa.array(np.frombuffer(self.columns[field], dtype=np.int32)) for field in self.TEXT_FIELDS}
+        columns["chunk_index"] = pa.array(np.frombuffer(self.chunk_index, dtype=np.int32))
+        columns["timestamp"] = pa.array(np.frombuffer(self.timestamp, dtype=np.float64))
+        columns["extra"] = pa.array(extra, type=pa.string())
+
+        self._write_table(path, pa.table(columns))
+        self._write_table(f"{path}.texts", pa.table({"text": pa.array(self.texts.texts, type=pa.string())}))
+
+    @classmethod
+    def load(cls, path: str) -> "CacheMetadata":
+        """Load a store written by `save`."""
+        store = cls()
+        table = cls._read_table(path)
+        for text in cls._read_table(f"{path}.texts").column("text").to_pylist():
+            store.texts.intern(text)
+
+        for field in cls.TEXT_FIELDS:
+            store.columns[field] = array("i", table.column(field).to_numpy().astype(np.int32).tobytes())
+        store.chunk_index = array("i", table.column("chunk_index").to_numpy().astype(np.int32).tobytes())
+        store.timestamp = array("d", table.column("timestamp").to_numpy().astype(np.float64).tobytes())
+        for row, extra in enumerate(table.column("extra").to_pylist()):
+            if extra is not None:
+                store.extra[row] = json.loads(extra)
+        return store
+
+    @staticmethod
+    def _write_table(path: str, table: "pa.Table") -> None:
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def _read_table(path: str) -> "pa.Table":
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    @staticmethod
+    def _parse_timestamp(timestamp: Optional[str]) -> float:
+        if timestamp is None:
+            return -1.0
+        try:
+            return datetime.fromisoformat(str(timestamp)).timestamp()
+        except ValueError:
+            return -1.0
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import weakref
+from io import BytesIO
+from typing import List, Optional
+
+import fitz
+
+
+def document_hash(pdf_content: bytes) -> str:
+    """
+    Compute the content hash used to key every per-document artifact.
+
+    Args:
+        pdf_content (bytes): Raw bytes of the PDF document.
+
+    Returns:
+        str: Hex encoded sha256 digest of the document bytes.
+    """
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+class DocumentStore:
+    """
+    Parsed view of one PDF, shared by everything that reads its pages.
+
+    The PDF is parsed at most once, on first use, and the text of every page is
+    memoized as it is asked for. Single page PDFs are cut from the open document with
+    `insert_pdf`, which copies only the objects the page references, so the whole document
+    is never rewritten. They are cheap to cut and are not memoized, so a store never holds
+    a second copy of the document.
+    Use `open_document` to get the store of a PDF, so the supervisor, the ingestion
+    pipeline, the page index and the partitioner all share the same one.
+
+    Args:
+        pdf_content (bytes): Raw bytes of the PDF document.
+        doc_hash (str, optional): Content hash of the document, computed if not given.
+    """
+
+    def __init__(self, pdf_content: bytes, doc_hash: Optional[str] = None):
+        self.pdf_content = pdf_content
+        self.doc_hash = doc_hash or document_hash(pdf_content)
+        self._document = None
+        self._page_texts = {}
+        self._lock = threading.RLock()
+
+    def _fitz_document(self):
+        with self._lock:
+            if self._document is None:
+                self._document = fitz.open(stream=BytesIO(self.pdf_content), filetype="pdf")
+            return self._document
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages of the document."""
+        return len(self._fitz_document())
+
+    def page_text(self, page_number: int) -> str:
+        """
+        Return the text of a page.
+
+        Args:
+            page_number (int): 1-based number of the page.
+
+        Returns:
+            str: The text of the page.
+        """
+        text = self._page_texts.get(page_number)
+        if text is None:
+            with self._lock:
+                text = self._fitz_document()[page_number - 1].get_text()
+                self._page_texts[page_number] = text
+        return text
+
+    def page_texts(self) -> List[str]:
+        """Return the text of every page, in page order."""
+        return [self.page_text(page_number) for page_number in range(1, self.page_count + 1)]
+
+    def first_pages_text(self, count: int) -> str:
+        """Return the concatenated text of the first `count` pages, or of all pages if there are fewer."""
+        return "".join(self.page_text(page_number) for page_number in range(1, min(count, self.page_count) + 1))
+
+    def page_pdf(self, page_number: int) -> bytes:
+        """
+        Return one page of the document as a standalone PDF.
+
+        Args:
+            page_number (int): 1-based number of the page.
+
+        Returns:
+            bytes: The single page PDF.
+        """
+        with self._lock:
+            page_document = fitz.open()
+            page_document.insert_pdf(self._fitz_document(), from_page=page_number - 1, to_page=page_number - 1)
+            data = page_document.tobytes()
+            page_document.close()
+        return data
+
+
+_documents = weakref.WeakValueDictionary()
+_documents_lock = threading.Lock()
+
+
+def open_document(pdf_content: bytes, doc_hash: Optional[str] = None) -> DocumentStore:
+    """
+    Return the shared `DocumentStore` of a PDF, keyed by content hash.
+
+    A store lives as long as something holds it (a chat session, an ingestion job),
+    so every reader of a PDF in use shares one parse of it.
+
+    Args:
+        pdf_content (bytes): Raw bytes of the PDF document.
+        doc_hash (str, optional): Content hash of the document, if the caller already has it.
+
+    Returns:
+        DocumentStore: The store of the document.
+    """
+    doc_hash = doc_hash or document_hash(pdf_content)
+    with _documents_lock:
+        document = _documents.get(doc_hash)
+        if document is None:
+            document = DocumentStore(pdf_content, doc_hash)
+            _documents[doc_hash] = document
+        return document
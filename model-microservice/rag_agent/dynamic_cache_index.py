@@ -1,310 +1,529 @@
-import nmslib
-from typing import List, Dict, Tuple, Optional
-import json
-from tqdm import tqdm
-import numpy as np
-from llama_index.embeddings.jinaai import JinaEmbedding
-import os
-
-class DynamicCacheIndex:
-    def __init__(self,
-                 dim: int = 768,
-                 index_type: str = 'hnsw',
-                 space: str = 'cosinesimil',
-                 batch_size: int = 32):
-        
-        """
-            Initialize a Dynamic Cache Index for efficient semantic searching and embedding storage.
-
-            Args:
-                dim (int, optional): Dimensionality of the embedding vectors. Defaults to 768.
-                index_type (str, optional): Type of index to use. Defaults to 'hnsw'.
-                space (str, optional): Similarity space metric for distance calculation. 
-                                        Defaults to 'cosinesimil' (cosine similarity).
-                batch_size (int, optional): Number of embeddings to process in a single batch. 
-                                            Defaults to 32.
-
-            Attributes:
-                dim (int): Dimension of embeddings
-                batch_size (int): Batch size for processing embeddings
-                metadata (dict): Storage for metadata associated with embeddings
-                embeddings (list): List of stored embedding vectors
-                id_counter (int): Unique identifier for each embedding
-                index_created (bool): Flag indicating if the index has been created
-                pending_additions (list): Temporary storage for embeddings to be added
-                text_embed_model (object): Embedding model for text conversion
-
-            Raises:
-                ValueError: If initialization of the embedding model fails
-        """
-        self.dim = dim
-        self.batch_size = batch_size
-        self.metadata = {}
-        self.embeddings = []
-        self.id_counter = 0
-        self.index_created = False
-        self.pending_additions = []
-        self.text_embed_model = None
-
-        # Initializing the HNSW index
-        self.index = nmslib.init(method=index_type, space=space)
-
-        # Initializing the embedding model
-        if not self.text_embed_model:
-          try:
-              self._init_embedding_model()
-          except Exception as e:
-              pass
-
-    def _init_embedding_model(self) -> None:
-        """Initialize the embedding model with error handling"""
-        try:
-            jina_api_key = os.getenv("JINAAI_API_KEY")
-            if not jina_api_key:
-                raise ValueError("JINAAI_API_KEY environment variable not set")
-
-            self.text_embed_model = JinaEmbedding(
-                api_key=jina_api_key,
-                model="jina-embeddings-v3",
-            )
-        except Exception as e:
-            raise
-
-    def process_pending_additions(self, force=False) -> bool:
-        """
-        Process and add pending embeddings to the HNSW index in batches.
-
-        Args:
-            force (bool, optional): Force processing even if batch is not full. 
-                                    Defaults to False.
-
-        Returns:
-            bool: True if processing is successful, False otherwise
-
-        Raises:
-            ValueError: If embedding dimension is incorrect
-        """
-        if not self.pending_additions and not force:
-            return False
-
-        try:
-            batches = [self.pending_additions[i:i + self.batch_size]
-                      for i in range(0, len(self.pending_additions), self.batch_size)]
-
-            with tqdm(total=len(batches), desc="Processing batches") as pbar:
-                for batch in batches:
-                    for embedding, metadata in batch:
-                        if not isinstance(embedding, np.ndarray):
-                            embedding = np.array(embedding)
-
-                        if embedding.shape[0] != self.dim:
-                            raise ValueError(f"Embedding dimension mismatch. Expected {self.dim}, got {embedding.shape[0]}")
-
-                        self.index.addDataPoint(self.id_counter, embedding)
-                        self.metadata[self.id_counter] = metadata
-                        self.embeddings.append(embedding)
-                        self.id_counter += 1
-                    pbar.update(1)
-
-            # Clear pending additions
-            self.pending_additions = []
-
-            # Recreate index with progress tracking
-            self.index.createIndex(
-                {'post': 2},
-                print_progress=True
-            )
-            self.index_created = True
-            return True
-
-        except Exception as e:
-            return False
-
-    def add_chunk(self, chunk: str, query_metadata: str = None) -> Optional[int]:
-        """
-        Add a text chunk to the dynamic cache index with embedded representation.
-
-        Args:
-            chunk (str): Text chunk to be embedded and indexed
-            query_metadata (str, optional): Metadata associated with the chunk, 
-                                            can be JSON string or dictionary
-
-        Returns:
-            Optional[int]: Unique identifier for the added chunk, or None if addition fails
-
-        Raises:
-            ValueError: For invalid embedding format or dimension mismatch
-        """
-        if not chunk:
-            return None
-
-        try:
-            if not self.text_embed_model:
-                self._init_embedding_model()
-
-            chunk_str = str(chunk)
-
-            metadata = {}
-            if query_metadata:
-                try:
-                    # Try to parse the metadata if it's a JSON string
-                    if isinstance(query_metadata, str):
-                        metadata = json.loads(query_metadata)
-                    elif isinstance(query_metadata, dict):
-                        metadata = query_metadata
-                    else:
-                        metadata = {'original_metadata': query_metadata}
-                except (json.JSONDecodeError, TypeError):
-                    # If parsing fails, store as is
-                    metadata = {'original_metadata': query_metadata}
-
-            if 'chunk' not in metadata:
-                metadata['chunk'] = chunk_str
-
-            chunk_embedding = self.text_embed_model.get_text_embedding(chunk_str)
-
-            if not isinstance(chunk_embedding, (list, np.ndarray)):
-                raise ValueError("Invalid embedding format")
-
-            if isinstance(chunk_embedding, list):
-                chunk_embedding = np.array(chunk_embedding)
-
-            # Validate embedding dimension
-            if chunk_embedding.shape[0] != self.dim:
-                raise ValueError(f"Embedding dimension mismatch. Expected {self.dim}, got {chunk_embedding.shape[0]}")
-
-            self.pending_additions.append((
-                chunk_embedding,
-                metadata
-            ))
-
-            # Process if batch size reached
-            if len(self.pending_additions) >= self.batch_size:
-                self.process_pending_additions()
-
-            return self.id_counter
-
-        except Exception as e:
-            return None
-
-    def search(self,
-              query_vector: np.ndarray,
-              k: int = 5) -> List[Tuple[int, float, Dict]]:
-        """
-        Perform a k-nearest neighbors search on the HNSW index.
-
-        Args:
-            query_vector (np.ndarray): Embedding vector to search against the index
-            k (int, optional): Number of top neighbors to retrieve. Defaults to 5.
-
-        Returns:
-            List[Tuple[int, float, Dict]]: A list of tuples containing:
-                - Chunk ID
-                - Distance/similarity score
-                - Metadata dictionary
-
-        Raises:
-            Exception: For any errors during the search process
-        """
-        if not isinstance(query_vector, np.ndarray):
-            try:
-                query_vector = np.array(query_vector)
-            except Exception as e:
-                return []
-
-        if query_vector.shape[0] != self.dim:
-            return []
-
-        try:
-            # Process any pending additions
-            if self.pending_additions:
-                if not self.process_pending_additions():
-                    return []
-
-            if not self.index_created or len(self.embeddings) == 0:
-                return []
-
-            k = min(k, len(self.embeddings))
-            ids, distances = self.index.knnQuery(query_vector, k=k) # retrieves the closest node and top k neighbours in the graph
-
-            results = []
-            for i, chunk_id in enumerate(ids):
-                metadata = self.metadata.get(int(chunk_id), {})
-
-                result_metadata = {
-                    'query': metadata.get('query', 'No query found'),
-                    'chunk': metadata.get('chunk', 'No chunk found'),
-                    'query_type': metadata.get('query_type', 'unknown'),
-                    'original_metadata': metadata
-                }
-
-                results.append((
-                    int(chunk_id),
-                    float(distances[i]),
-                    result_metadata
-                ))
-
-            return results
-
-        except Exception as e:
-            return []
-
-    def save_index(self, filename: str, save_data: bool = True) -> None:
-        """
-        Save the current index and its associated metadata to disk.
-
-        Args:
-            filename (str): Base filename for saving the index
-            save_data (bool, optional): Whether to save additional index data. 
-                                        Defaults to True.
-
-        Raises:
-            Exception: If there are issues during index or metadata saving
-        """
-        try:
-            self.index.saveIndex(filename, save_data)
-
-            metadata_file = f"{filename}_metadata.json"
-            with open(metadata_file, 'w') as f:
-                json.dump({str(k): v for k, v in self.metadata.items()}, f)
-
-        except Exception as e:
-            raise
-
-    def load_index(self, filename: str) -> None:
-        """
-        Load a previously saved index and its metadata from disk.
-
-        Args:
-            filename (str): Base filename of the index to be loaded
-
-        Raises:
-            Exception: If there are issues during index or metadata loading
-        """
-        try:
-            self.index.loadIndex(filename)
-
-            metadata_file = f"{filename}_metadata.json"
-            with open(metadata_file, 'r') as f:
-                self.metadata = {int(k): v for k, v in json.load(f).items()}
-
-            self.index_created = True
-
-        except Exception as e:
-            raise
-
-    def get_neighbors(self, chunk_id, k=5):
-        """
-        Retrieve nearest neighbors for a specific chunk in the HNSW index.
-
-        Args:
-            chunk_id (int): Unique identifier of the chunk to find neighbors for
-            k (int, optional): Number of neighbors to retrieve. Defaults to 5.
-
-        Returns:
-            Tuple: 
-                - neighbors (array): IDs of neighboring chunks
-                - distances (array): Distances/similarities to those neighbors
-        """
-        neighbors, distances = self.index.knnQuery(self.embeddings[chunk_id], k=k)
+import nmslib
+from typing import List, Dict, Tuple, Optional
+import json
+import shutil
+import threading
+import time
+import numpy as np
+from rag_agent.utils import cache_embed_model, embedding_service, CACHE_INDEX_DTYPE
+from rag_agent.cache_storage import EmbeddingMatrix, CacheMetadata
+import os
+
+class DynamicCacheIndex:
+    SNAPSHOT_VERSION = 1
+    MANIFEST_FILE = "manifest.json"
+    CURRENT_FILE = "CURRENT"
+
+    def __init__(self,
+                 dim: int = 768,
+                 index_type: str = 'hnsw',
+                 space: str = 'cosinesimil',
+                 batch_size: int = 32,
+                 merge_ratio: float = 0.5,
+                 storage_dtype: str = CACHE_INDEX_DTYPE):
+        
+        """
+            Initialize a Dynamic Cache Index for efficient semantic searching and embedding storage.
+
+            Args:
+                dim (int, optional): Dimensionality of the embedding vectors. Defaults to 768.
+                index_type (str, optional): Type of index to use. Defaults to 'hnsw'.
+                space (str, optional): Similarity space metric for distance calculation. 
+                                        Defaults to 'cosinesimil' (cosine similarity).
+                batch_size (int, optional): Number of embeddings to process in a single batch. 
+                                            Defaults to 32.
+                merge_ratio (float, optional): Pending embeddings are merged into the HNSW
+                                               index once they exceed this fraction of the
+                                               indexed ones (and `batch_size`). Defaults to 0.5.
+                storage_dtype (str, optional): Storage type of the embedding matrices, one of
+                                               'float32', 'float16' or 'int8'.
+                                               Defaults to CACHE_INDEX_DTYPE.
+
+            Attributes:
+                dim (int): Dimension of embeddings
+                batch_size (int): Batch size for processing embeddings
+                metadata (CacheMetadata): Columnar storage for metadata associated with embeddings
+                embeddings (EmbeddingMatrix): Contiguous matrix of stored embedding vectors
+                id_counter (int): Unique identifier for each embedding
+                index_created (bool): Flag indicating if the index has been created
+                indexed_count (int): Number of embeddings merged into the HNSW index
+                pending_additions (list): IDs of added chunks not yet merged into the HNSW
+                                          index, searched by brute force
+                text_embed_model (object): Embedding model for text conversion
+                query_embeddings (EmbeddingMatrix): Normalized matrix of the embedded `query`
+                                                    of every added chunk
+                query_chunk_ids (list): Chunk ID behind each row of `query_embeddings`
+
+            Raises:
+                ValueError: If initialization of the embedding model fails
+        """
+        self.dim = dim
+        self.index_type = index_type
+        self.space = space
+        self.storage_dtype = storage_dtype
+        self.batch_size = batch_size
+        self.merge_ratio = merge_ratio
+        self.metadata = CacheMetadata()
+        self.embeddings = EmbeddingMatrix(dim, storage_dtype)
+        self.id_counter = 0
+        self.index_created = False
+        self.indexed_count = 0
+        self.pending_additions = []
+        self.text_embed_model = None
+        self.query_embeddings = EmbeddingMatrix(dim, storage_dtype)
+        self.query_chunk_ids = []
+
+        # Initializing the HNSW index
+        self.index = nmslib.init(method=index_type, space=space)
+
+        # Initializing the embedding model
+        if not self.text_embed_model:
+          try:
+              self._init_embedding_model()
+          except Exception as e:
+              pass
+
+    def _init_embedding_model(self) -> None:
+        """Initialize the embedding model with error handling"""
+        try:
+            jina_api_key = os.getenv("JINAAI_API_KEY")
+            if not jina_api_key:
+                raise ValueError("JINAAI_API_KEY environment variable not set")
+
+            self.text_embed_model = cache_embed_model
+        except Exception as e:
+            raise
+
+    def process_pending_additions(self, force=False) -> bool:
+        """
+        Merge pending embeddings into the HNSW index.
+
+        nmslib rebuilds the whole graph on `createIndex`, so pending embeddings are only
+        merged once they outnumber `merge_ratio` times the indexed ones (or `batch_size`).
+        The merge threshold grows with the index, which keeps the total rebuild cost
+        linear in the number of chunks instead of quadratic. Until then `search` covers
+        them with a brute-force scan.
+
+        The merged chunks (the first `indexed_count` chunk IDs) and the pending ones are
+        built into a fresh index that replaces the current one only once it is complete,
+        so a failed merge leaves the index untouched and can simply be retried.
+
+        Args:
+            force (bool, optional): Merge even if the threshold is not reached. 
+                                    Defaults to False.
+
+        Returns:
+            bool: True if pending embeddings were merged, False otherwise
+        """
+        if not self.pending_additions:
+            return False
+
+        threshold = max(self.batch_size, self.merge_ratio * self.indexed_count)
+        if not force and len(self.pending_additions) < threshold:
+            return False
+
+        pending = list(self.pending_additions)
+        try:
+            ids = np.array(list(range(self.indexed_count)) + pending, dtype=np.int32)
+            index = nmslib.init(method=self.index_type, space=self.space)
+            index.addDataPointBatch(self.embeddings.rows(ids), ids)
+            index.createIndex(
+                {'post': 2},
+                print_progress=False
+            )
+
+            self.index = index
+            self.indexed_count = len(ids)
+            self.pending_additions = self.pending_additions[len(pending):]
+            self.index_created = True
+            return True
+
+        except Exception as e:
+            return False
+
+    def add_chunk(self, chunk: str, query_metadata: str = None) -> Optional[int]:
+        """
+        Add a text chunk to the dynamic cache index with embedded representation.
+
+        Args:
+            chunk (str): Text chunk to be embedded and indexed
+            query_metadata (str, optional): Metadata associated with the chunk, 
+                                            can be JSON string or dictionary
+
+        Returns:
+            Optional[int]: Unique identifier for the added chunk, or None if addition fails
+
+        Raises:
+            ValueError: For invalid embedding format or dimension mismatch
+        """
+        if not chunk:
+            return None
+
+        try:
+            if not self.text_embed_model:
+                self._init_embedding_model()
+
+            chunk_str = str(chunk)
+
+            metadata = {}
+            if query_metadata:
+                try:
+                    # Try to parse the metadata if it's a JSON string
+                    if isinstance(query_metadata, str):
+                        metadata = json.loads(query_metadata)
+                    elif isinstance(query_metadata, dict):
+                        metadata = query_metadata
+                    else:
+                        metadata = {'original_metadata': query_metadata}
+                except (json.JSONDecodeError, TypeError):
+                    # If parsing fails, store as is
+                    metadata = {'original_metadata': query_metadata}
+
+            if 'chunk' not in metadata:
+                metadata['chunk'] = chunk_str
+
+            query = metadata.get('query')
+            texts = [chunk_str] if query is None else [chunk_str, str(query)]
+            embeddings = embedding_service(self.text_embed_model).embed(texts)
+            chunk_embedding = embeddings[0]
+
+            if not isinstance(chunk_embedding, (list, np.ndarray)):
+                raise ValueError("Invalid embedding format")
+
+            if isinstance(chunk_embedding, list):
+                chunk_embedding = np.array(chunk_embedding)
+
+            # Validate embedding dimension
+            if chunk_embedding.shape[0] != self.dim:
+                raise ValueError(f"Embedding dimension mismatch. Expected {self.dim}, got {chunk_embedding.shape[0]}")
+
+            chunk_id = self.metadata.append(metadata)
+            self.embeddings.append(chunk_embedding)
+            self.id_counter = chunk_id + 1
+            self.pending_additions.append(chunk_id)
+            if query is not None:
+                self._add_query_embedding(embeddings[1], chunk_id)
+
+            # Merge into the HNSW index once the pending tail is large enough
+            self.process_pending_additions()
+
+            return chunk_id
+
+        except Exception as e:
+            return None
+
+    def _add_query_embedding(self, embedding: np.ndarray, chunk_id: int) -> None:
+        """Append a normalized query embedding to `query_embeddings`."""
+        norm = np.linalg.norm(embedding)
+        self.query_embeddings.append(embedding / norm if norm else embedding)
+        self.query_chunk_ids.append(chunk_id)
+
+    def best_query_match(self, query_vector: np.ndarray) -> Tuple[Optional[Dict], float]:
+        """
+        Find the cached query most similar to a query embedding.
+
+        The similarity against every cached query is computed with a single
+        matrix-vector product over `query_embeddings`, which also covers chunks that
+        are still pending insertion into the HNSW index.
+
+        Args:
+            query_vector (np.ndarray): Embedding of the query to look up
+
+        Returns:
+            Tuple[Optional[Dict], float]: Metadata of the best matching chunk and its cosine
+                                          similarity, or (None, 0.0) if nothing is cached
+        """
+        if len(self.query_embeddings) == 0:
+            return None, 0.0
+
+        query_vector = np.asarray(query_vector, dtype="float32")
+        norm = np.linalg.norm(query_vector)
+        if query_vector.shape[0] != self.dim or not norm:
+            return None, 0.0
+
+        scores = self.query_embeddings.dot(query_vector / norm)
+        best = int(np.argmax(scores))
+        return self.metadata[self.query_chunk_ids[best]], float(scores[best])
+
+    def _scan_pending(self, query_vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Brute-force cosine distances between a query and the pending (unmerged) embeddings."""
+        if not self.pending_additions:
+            return []
+
+        ids = np.array(self.pending_additions)
+        vectors = self.embeddings.rows(ids)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+        norms[norms == 0] = 1.0
+        distances = 1.0 - (vectors @ query_vector) / norms
+
+        top = np.argsort(distances)[:k]
+        return [(int(ids[i]), float(distances[i])) for i in top]
+
+    def search(self,
+              query_vector: np.ndarray,
+              k: int = 5) -> List[Tuple[int, float, Dict]]:
+        """
+        Perform a k-nearest neighbors search over the cached chunks.
+
+        Merged chunks are searched through the HNSW index and pending ones through a
+        brute-force scan, so a search never waits for an index rebuild.
+
+        Args:
+            query_vector (np.ndarray): Embedding vector to search against the index
+            k (int, optional): Number of top neighbors to retrieve. Defaults to 5.
+
+        Returns:
+            List[Tuple[int, float, Dict]]: A list of tuples containing:
+                - Chunk ID
+                - Distance/similarity score
+                - Metadata dictionary
+
+        Raises:
+            Exception: For any errors during the search process
+        """
+        if not isinstance(query_vector, np.ndarray):
+            try:
+                query_vector = np.array(query_vector)
+            except Exception as e:
+                return []
+
+        if query_vector.shape[0] != self.dim:
+            return []
+
+        try:
+            if len(self.embeddings) == 0:
+                return []
+
+            k = min(k, len(self.embeddings))
+            candidates = self._scan_pending(query_vector, k)
+
+            if self.index_created and self.indexed_count > 0:
+                # retrieves the closest node and top k neighbours in the graph
+                ids, distances = self.index.knnQuery(query_vector, k=min(k, self.indexed_count))
+                candidates.extend((int(chunk_id), float(distance)) for chunk_id, distance in zip(ids, distances))
+
+            candidates.sort(key=lambda candidate: candidate[1])
+
+            results = []
+            for chunk_id, distance in candidates[:k]:
+                metadata = self.metadata.get(chunk_id, {})
+
+                result_metadata = {
+                    'query': metadata.get('query', 'No query found'),
+                    'chunk': metadata.get('chunk', 'No chunk found'),
+                    'query_type': metadata.get('query_type', 'unknown'),
+                    'original_metadata': metadata
+                }
+
+                results.append((
+                    chunk_id,
+                    distance,
+                    result_metadata
+                ))
+
+            return results
+
+        except Exception as e:
+            return []
+
+    def save_index(self, path: str, save_data: bool = True, version: Optional[str] = None) -> None:
+        """
+        Save a versioned snapshot of the full index state under the directory `path`.
+
+        The snapshot contains:
+            - manifest.json: format version, configuration, counters and pending chunk IDs
+            - embeddings.npy, query_embeddings.npy, query_chunk_ids.npy: mmap-able vectors
+            - metadata.arrow, metadata.arrow.texts: columnar metadata in Arrow IPC format
+            - hnsw.bin: the merged HNSW graph
+        Every save is written to a temporary directory, renamed to a new version
+        subdirectory `path/v<version>` and published by atomically replacing
+        the `path/CURRENT` file naming it. Older versions are removed only afterwards, so
+        a crash at any point leaves the previous or the new snapshot readable.
+
+        Args:
+            path (str): Directory to write the snapshot to
+            save_data (bool, optional): Whether to store the vectors with the HNSW graph, so
+                                        it loads without re-adding them. Defaults to True.
+            version (str, optional): Name of the snapshot version, which has to sort after the
+                                     versions saved before it. Defaults to
+                                     `<time>-<pid>-<thread>` of the save.
+
+        Raises:
+            Exception: If there are issues during index or metadata saving
+        """
+        if version is None:
+            version = f"{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}"
+        version = f"v{version}"
+        tmp_path = os.path.join(path, f".tmp-{version}")
+        try:
+            os.makedirs(tmp_path)
+
+            self.embeddings.save(os.path.join(tmp_path, "embeddings.npy"))
+            self.query_embeddings.save(os.path.join(tmp_path, "query_embeddings.npy"))
+            np.save(os.path.join(tmp_path, "query_chunk_ids.npy"), np.array(self.query_chunk_ids, dtype=np.int64))
+            self.metadata.save(os.path.join(tmp_path, "metadata.arrow"))
+            if self.index_created and self.indexed_count > 0:
+                self.index.saveIndex(os.path.join(tmp_path, "hnsw.bin"), save_data)
+
+            manifest = {
+                "version": self.SNAPSHOT_VERSION,
+                "dim": self.dim,
+                "index_type": self.index_type,
+                "space": self.space,
+                "storage_dtype": self.storage_dtype,
+                "batch_size": self.batch_size,
+                "merge_ratio": self.merge_ratio,
+                "id_counter": self.id_counter,
+                "indexed_count": self.indexed_count if self.index_created else 0,
+                "pending_additions": list(self.pending_additions),
+                "hnsw_data": save_data,
+            }
+            with open(os.path.join(tmp_path, self.MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f)
+
+            os.replace(tmp_path, os.path.join(path, version))
+
+        except Exception as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        current_tmp = os.path.join(path, f"{self.CURRENT_FILE}.tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(current_tmp, 'w') as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(path, self.CURRENT_FILE))
+        self._prune_snapshots(path, version)
+
+    @classmethod
+    def _prune_snapshots(cls, path: str, version: str) -> None:
+        """Remove the snapshot versions older than `version`, except the published one."""
+        current = cls._current_version(path)
+        for name in os.listdir(path):
+            if name.startswith("v") and name < version and name != current:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    @classmethod
+    def _current_version(cls, path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(path, cls.CURRENT_FILE), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def snapshot_dir(cls, path: str) -> str:
+        """
+        Resolve the directory holding the published snapshot under `path`.
+
+        Falls back to the newest complete version if the published one was removed by a
+        concurrent save, and to `path` itself for snapshots written before versioning.
+        """
+        current = cls._current_version(path)
+        if current and os.path.isfile(os.path.join(path, current, cls.MANIFEST_FILE)):
+            return os.path.join(path, current)
+        versions = sorted(name for name in os.listdir(path)
+                          if name.startswith("v") and os.path.isfile(os.path.join(path, name, cls.MANIFEST_FILE)))
+        if versions:
+            return os.path.join(path, versions[-1])
+        return path
+
+    def load_index(self, path: str) -> None:
+        """
+        Restore the full index state from a snapshot written by `save_index`.
+
+        Vectors are memory-mapped rather than read, so restoring takes milliseconds
+        regardless of the cache size.
+
+        Args:
+            path (str): Directory the snapshot was saved to
+
+        Raises:
+            ValueError: If the snapshot was written with an unsupported format version
+            Exception: If there are issues during index or metadata loading
+        """
+        try:
+            path = self.snapshot_dir(path)
+            manifest = self.read_manifest(path)
+            if manifest["dim"] != self.dim:
+                raise ValueError(f"Embedding dimension mismatch. Expected {self.dim}, got {manifest['dim']}")
+
+            self.storage_dtype = manifest["storage_dtype"]
+            self.embeddings = EmbeddingMatrix.load(os.path.join(path, "embeddings.npy"), self.dim, self.storage_dtype)
+            self.query_embeddings = EmbeddingMatrix.load(os.path.join(path, "query_embeddings.npy"), self.dim, self.storage_dtype)
+            self.query_chunk_ids = np.load(os.path.join(path, "query_chunk_ids.npy")).tolist()
+            self.metadata = CacheMetadata.load(os.path.join(path, "metadata.arrow"))
+            self.id_counter = manifest["id_counter"]
+            self.pending_additions = list(manifest["pending_additions"])
+            self.indexed_count = manifest["indexed_count"]
+
+            self.index_type = manifest["index_type"]
+            self.space = manifest["space"]
+            self.index = nmslib.init(method=self.index_type, space=self.space)
+            self.index_created = False
+            if self.indexed_count > 0:
+                if manifest["hnsw_data"]:
+                    self.index.loadIndex(os.path.join(path, "hnsw.bin"), load_data=True)
+                    self.index_created = True
+                else:
+                    # Graph saved without its vectors: fold the merged chunks back into the tail
+                    self.pending_additions = list(range(self.indexed_count)) + self.pending_additions
+                    self.indexed_count = 0
+                    self.process_pending_additions(force=True)
+
+        except Exception as e:
+            raise
+
+    @classmethod
+    def read_manifest(cls, path: str) -> Dict:
+        """
+        Read and validate the manifest of a snapshot.
+
+        Args:
+            path (str): Directory of the snapshot version, see `snapshot_dir`
+
+        Raises:
+            ValueError: If the snapshot was written with an unsupported format version
+        """
+        with open(os.path.join(path, cls.MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != cls.SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {manifest.get('version')}. Expected {cls.SNAPSHOT_VERSION}")
+        return manifest
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "DynamicCacheIndex":
+        """
+        Create a DynamicCacheIndex from a snapshot written by `save_index`.
+
+        Args:
+            path (str): Directory the snapshot was saved to
+
+        Returns:
+            DynamicCacheIndex: The restored index
+        """
+        manifest = cls.read_manifest(cls.snapshot_dir(path))
+        cache_index = cls(dim=manifest["dim"],
+                          index_type=manifest["index_type"],
+                          space=manifest["space"],
+                          batch_size=manifest["batch_size"],
+                          merge_ratio=manifest["merge_ratio"],
+                          storage_dtype=manifest["storage_dtype"])
+        cache_index.load_index(path)
+        return cache_index
+
+    def get_neighbors(self, chunk_id, k=5):
+        """
+        Retrieve nearest neighbors for a specific chunk in the HNSW index.
+
+        Args:
+            chunk_id (int): Unique identifier of the chunk to find neighbors for
+            k (int, optional): Number of neighbors to retrieve. Defaults to 5.
+
+        Returns:
+            Tuple: 
+                - neighbors (array): IDs of neighboring chunks
+                - distances (array): Distances/similarities to those neighbors
+        """
+        results = self.search(self.embeddings[chunk_id], k=k)
+        neighbors = np.array([neighbor_id for neighbor_id, _, _ in results], dtype=np.int32)
+        distances = np.array([distance for _, distance, _ in results], dtype=np.float32)
         return neighbors, distances
\ No newline at end of file
@@ -0,0 +1,317 @@
+import atexit
+import fcntl
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embedding vectors.
+
+    Vectors are keyed by (model, task, dimensions, sha256(text)) and held as float32
+    arrays in an in-memory LRU bounded by `max_bytes`. Entries evicted from memory
+    are spilled to an append-only vector file under `root`, which is read back
+    through a memory map, so a vector is never requested from the embedding API
+    twice, even across restarts.
+
+    Evicted entries are spilled in one batch after the cache lock is released, so
+    embedding calls never wait on disk. When the vector file grows over
+    `max_disk_bytes` it is compacted to the most recently spilled half. The files
+    are shared by every process using `root`: appends and compactions hold an
+    exclusive `fcntl` lock on `root/.lock`, and a process reloads its key index under
+    a shared lock whenever another process compacted the files.
+
+    Args:
+        root (str, optional): Directory of the on-disk store. The cache is memory
+                              only when not provided. Defaults to None.
+        max_bytes (int, optional): Byte budget of the in-memory LRU. Defaults to 256 MB.
+        max_disk_bytes (int, optional): Byte budget of the vector file. Defaults to 2 GB.
+
+    Attributes:
+        hits (int): Lookups served from memory.
+        disk_hits (int): Lookups served from the memory-mapped store.
+        misses (int): Lookups that were not cached.
+        evictions (int): Entries evicted from the in-memory LRU.
+        compactions (int): Compactions of the on-disk store done by this process.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    KEYS_FILE = "keys.log"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024,
+                 max_disk_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compactions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._spilling: Dict[str, np.ndarray] = {}
+        self._disk_index: Dict[str, Tuple[int, int]] = {}
+        self._keys_inode = None
+        self._mmap = None
+        self._lock = threading.RLock()
+        self._spill_lock = threading.Lock()
+
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+            with self._file_lock(fcntl.LOCK_SH):
+                self._load_disk_index()
+            atexit.register(self.persist)
+
+    @staticmethod
+    def make_key(namespace: Tuple, text: str) -> str:
+        """
+        Build the cache key of a text.
+
+        Args:
+            namespace (Tuple): (model, task, dimensions) of the embedding model.
+            text (str): The embedded text.
+
+        Returns:
+            str: The cache key.
+        """
+        digest = hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+        return "|".join(str(part) for part in namespace) + "|" + digest
+
+    def get(self, namespace: Tuple, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the cached embedding of a text.
+
+        Returns:
+            Optional[np.ndarray]: The float32 vector, or None on a miss.
+        """
+        key = self.make_key(namespace, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            vector = self._spilling.get(key)
+            if vector is None:
+                vector = self._read_disk(key)
+            if vector is not None:
+                self.disk_hits += 1
+                evicted = self._insert(key, vector)
+            else:
+                self.misses += 1
+        if vector is not None:
+            self._spill(evicted)
+        return vector
+
+    def get_many(self, namespace: Tuple, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up several texts at once, returning None for every miss."""
+        return [self.get(namespace, text) for text in texts]
+
+    def put(self, namespace: Tuple, text: str, vector) -> None:
+        """
+        Store the embedding of a text.
+
+        Args:
+            namespace (Tuple): (model, task, dimensions) of the embedding model.
+            text (str): The embedded text.
+            vector (array-like): Its embedding. A read-only copy is stored.
+        """
+        key = self.make_key(namespace, text)
+        vector = np.array(vector, dtype="float32", order="C", copy=True)
+        vector.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            evicted = self._insert(key, vector)
+        self._spill(evicted)
+
+    def stats(self) -> Dict:
+        """
+        Report the cache counters.
+
+        Returns:
+            Dict: hits, disk_hits, misses, evictions, compactions, hit_rate, the number of
+                  entries and bytes held in memory, and the number of entries and bytes on disk.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "compactions": self.compactions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes(),
+            }
+
+    def persist(self) -> None:
+        """Spill every in-memory entry to the on-disk store."""
+        if not self.root:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        self._spill(entries)
+
+    def _insert(self, key: str, vector: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        """Add an entry to the LRU and return the entries evicted to make room, to be spilled."""
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+        evicted = []
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._bytes -= old_vector.nbytes
+            self.evictions += 1
+            if self.root and old_key not in self._disk_index:
+                self._spilling[old_key] = old_vector
+                evicted.append((old_key, old_vector))
+        return evicted
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        with open(self._path(self.LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _disk_bytes(self) -> int:
+        try:
+            return os.path.getsize(self._path(self.VECTORS_FILE)) if self.root else 0
+        except FileNotFoundError:
+            return 0
+
+    def _load_disk_index(self) -> None:
+        """Reload the key index and drop the memory map. Called with the file lock held."""
+        keys_path = self._path(self.KEYS_FILE)
+        disk_index = {}
+        try:
+            self._keys_inode = os.stat(keys_path).st_ino
+            with open(keys_path, "r") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3:
+                        disk_index[parts[0]] = (int(parts[1]), int(parts[2]))
+        except FileNotFoundError:
+            self._keys_inode = None
+        self._disk_index = disk_index
+        self._mmap = None
+
+    def _compacted_elsewhere(self) -> bool:
+        try:
+            return os.stat(self._path(self.KEYS_FILE)).st_ino != self._keys_inode
+        except FileNotFoundError:
+            return self._keys_inode is not None
+
+    def _spill(self, entries: List[Tuple[str, np.ndarray]]) -> None:
+        """Append entries to the on-disk store in one batch. Called without the cache lock held."""
+        if not self.root or not entries:
+            return
+        with self._spill_lock:
+            try:
+                with self._file_lock(fcntl.LOCK_EX):
+                    with self._lock:
+                        if self._compacted_elsewhere():
+                            self._load_disk_index()
+                        entries = [(key, vector) for key, vector in entries if key not in self._disk_index]
+                    if not entries:
+                        return
+
+                    locations = {}
+                    with open(self._path(self.VECTORS_FILE), "ab") as vectors_file, \
+                         open(self._path(self.KEYS_FILE), "a") as keys_file:
+                        offset = vectors_file.seek(0, os.SEEK_END) // 4
+                        for key, vector in entries:
+                            vectors_file.write(vector.tobytes())
+                            keys_file.write(f"{key} {offset} {vector.shape[0]}\n")
+                            locations[key] = (offset, vector.shape[0])
+                            offset += vector.shape[0]
+                        # Vectors before keys, and both before the unlock, so no process
+                        # ever reads a key whose vector is not written yet
+                        vectors_file.flush()
+                        keys_file.flush()
+                    with self._lock:
+                        if self._keys_inode is None:
+                            self._keys_inode = os.stat(self._path(self.KEYS_FILE)).st_ino
+                        self._disk_index.update(locations)
+
+                    if self._disk_bytes() > self.max_disk_bytes:
+                        self._compact()
+            except Exception as e:
+                pass
+            finally:
+                with self._lock:
+                    for key, _ in entries:
+                        self._spilling.pop(key, None)
+
+    def _compact(self) -> None:
+        """
+        Rewrite the store with the most recently spilled entries that fit in half of
+        `max_disk_bytes`. Called with the exclusive file lock held.
+        """
+        with self._lock:
+            entries = list(self._disk_index.items())
+        vectors = np.memmap(self._path(self.VECTORS_FILE), dtype="float32", mode="r")
+
+        kept, size = [], 0
+        for key, (offset, dim) in reversed(entries):
+            if size + 4 * dim > self.max_disk_bytes // 2:
+                break
+            kept.append((key, offset, dim))
+            size += 4 * dim
+        kept.reverse()
+
+        suffix = f".tmp-{os.getpid()}-{threading.get_ident()}"
+        offset = 0
+        with open(self._path(self.VECTORS_FILE) + suffix, "wb") as vectors_file, \
+             open(self._path(self.KEYS_FILE) + suffix, "w") as keys_file:
+            for key, old_offset, dim in kept:
+                vectors_file.write(np.asarray(vectors[old_offset:old_offset + dim]).tobytes())
+                keys_file.write(f"{key} {offset} {dim}\n")
+                offset += dim
+        del vectors
+        os.replace(self._path(self.VECTORS_FILE) + suffix, self._path(self.VECTORS_FILE))
+        os.replace(self._path(self.KEYS_FILE) + suffix, self._path(self.KEYS_FILE))
+        with self._lock:
+            self._load_disk_index()
+            self.compactions += 1
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        location = self._disk_index.get(key)
+        if location is None:
+            return None
+        offset, dim = location
+        try:
+            if self._mmap is None or self._mmap.shape[0] < offset + dim:
+                # Non-blocking: a spill holding the exclusive lock may be waiting for the
+                # cache lock held here, so a busy store is treated as a miss
+                with self._file_lock(fcntl.LOCK_SH | fcntl.LOCK_NB):
+                    if self._compacted_elsewhere():
+                        self._load_disk_index()
+                        location = self._disk_index.get(key)
+                        if location is None:
+                            return None
+                        offset, dim = location
+                    self._mmap = np.memmap(self._path(self.VECTORS_FILE), dtype="float32", mode="r")
+            vector = np.array(self._mmap[offset:offset + dim])
+            vector.flags.writeable = False
+            return vector
+        except (OSError, ValueError):
+            return None
\ No newline at end of file
@@ -0,0 +1,220 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import requests
+
+from rag_agent.document_store import open_document
+from rag_agent.page_index import page_index_store
+from rag_agent.raptor_store import raptor_tree_store
+from rag_agent.retriever import build_jina_retriever, page_texts_from_elements, partition_pages
+from rag_agent.supervisor_utils import generate_pdf_name
+from rag_agent.utils import INGEST_JOB_CACHE_SIZE, INGEST_WORKERS
+from llama_index.core import Document
+
+
+def ingestion_job_id(url: str) -> str:
+    """Return the id of the ingestion job of a document url."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class IngestionJob:
+    """
+    State and artifacts of the ingestion of one document.
+
+    Attributes:
+        job_id (str): Id of the job, derived from the document url.
+        url (str): Url the PDF is downloaded from.
+        raptor (bool): Whether a RAPTOR retriever (True) or a Jina chunk retriever (False) is built.
+        status (str): One of 'queued', 'running', 'ready' or 'failed'.
+        stage (Optional[str]): Stage currently running.
+        completed_stages (List[str]): Stages finished so far.
+        stage_seconds (Dict[str, float]): Wall time of every finished stage.
+        error (Optional[str]): Error message of a failed job.
+        doc_hash (Optional[str]): Content hash of the PDF.
+        pdf_content (Optional[bytes]): Raw bytes of the PDF.
+        document (Optional[DocumentStore]): Parsed pages of the PDF.
+        pdf_title (Optional[str]): Generated title of the PDF.
+        page_count (Optional[int]): Number of pages of the PDF.
+        retriever (Optional[BaseRetriever]): Retriever over the whole document.
+    """
+
+    STAGES = ("download", "parse", "page_index", "partition", "table_summaries", "retriever")
+
+    def __init__(self, url: str, raptor: bool = True, top_k: int = 5):
+        self.job_id = ingestion_job_id(url)
+        self.url = url
+        self.raptor = raptor
+        self.top_k = top_k
+        self.status = "queued"
+        self.stage = None
+        self.completed_stages = []
+        self.stage_seconds = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+        self.doc_hash = None
+        self.pdf_content = None
+        self.document = None
+        self.pdf_title = None
+        self.page_count = None
+        self.elements = None
+        self.docs = None
+        self.retriever = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    @property
+    def progress(self) -> float:
+        return len(self.completed_stages) / len(self.STAGES)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the job is finished.
+
+        Returns:
+            bool: True if the job is ready.
+        """
+        self._done.wait(timeout)
+        return self.ready
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "url": self.url,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "completed_stages": list(self.completed_stages),
+            "stage_seconds": dict(self.stage_seconds),
+            "error": self.error,
+            "doc_hash": self.doc_hash,
+            "pdf_title": self.pdf_title,
+            "page_count": self.page_count,
+        }
+
+
+class IngestionPipeline:
+    """
+    Background pipeline that prepares a document before it is queried.
+
+    A submitted document is downloaded, parsed and titled, page embedded, partitioned
+    page by page, table summarized and indexed by a retriever over the whole document,
+    on a small thread pool. Page indices, partitions, table summaries and RAPTOR trees
+    are persisted by their own stores, so re-ingesting after a restart is cheap. Queries on
+    a document whose job is ready start from these artifacts instead of building them.
+
+    Finished jobs hold their document and retriever, so only the `max_jobs` most recently
+    used ones are kept; an evicted document is queried from its persisted artifacts or
+    submitted again. Queued and running jobs are never evicted.
+
+    Args:
+        max_workers (int, optional): Number of documents ingested concurrently. Defaults to INGEST_WORKERS.
+        max_jobs (int, optional): Number of finished jobs kept. Defaults to INGEST_JOB_CACHE_SIZE.
+    """
+
+    def __init__(self, max_workers: int = INGEST_WORKERS, max_jobs: int = INGEST_JOB_CACHE_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, IngestionJob] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, url: str, raptor: bool = True) -> IngestionJob:
+        """
+        Start ingesting a document, unless it is already ingested or being ingested.
+
+        Args:
+            url (str): Url of the PDF.
+            raptor (bool, optional): Build a RAPTOR retriever instead of a Jina chunk retriever. Defaults to True.
+
+        Returns:
+            IngestionJob: The job of the document.
+        """
+        with self._lock:
+            job = self._jobs.get(ingestion_job_id(url))
+            if job is not None and job.status != "failed" and job.raptor == raptor:
+                return job
+            job = IngestionJob(url, raptor)
+            self._jobs[job.job_id] = job
+            self._jobs.move_to_end(job.job_id)
+            self._evict()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, url: str) -> Optional[IngestionJob]:
+        """Return the job of a document url, if it was submitted and is still kept."""
+        return self.get_job(ingestion_job_id(url))
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        """Return a job by id."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def _evict(self) -> None:
+        # Drop the least recently used finished jobs beyond max_jobs
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items() if job._done.is_set()][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: IngestionJob) -> None:
+        job.status = "running"
+        try:
+            for stage in job.STAGES:
+                job.stage = stage
+                start = time.perf_counter()
+                getattr(self, f"_{stage}")(job)
+                job.stage_seconds[stage] = time.perf_counter() - start
+                job.completed_stages.append(stage)
+            job.status = "ready"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.stage = None
+            job.elements = None
+            job.docs = None
+            job.finished_at = time.time()
+            job._done.set()
+            with self._lock:
+                self._evict()
+
+    def _download(self, job: IngestionJob) -> None:
+        response = requests.get(job.url)
+        response.raise_for_status()
+        job.pdf_content = response.content
+        job.document = open_document(job.pdf_content)
+        job.doc_hash = job.document.doc_hash
+
+    def _parse(self, job: IngestionJob) -> None:
+        job.page_count = job.document.page_count
+        job.pdf_title = generate_pdf_name(job.document.first_pages_text(2))
+
+    def _page_index(self, job: IngestionJob) -> None:
+        page_index_store.get(job.document)
+
+    def _partition(self, job: IngestionJob) -> None:
+        job.elements = partition_pages(job.document, list(range(1, job.page_count + 1)))
+
+    def _table_summaries(self, job: IngestionJob) -> None:
+        page_metadata = page_texts_from_elements(job.elements)
+        job.docs = [Document(text=content, metadata={"page_number": page_num})
+                    for page_num, content in page_metadata.items() if content]
+
+    def _retriever(self, job: IngestionJob) -> None:
+        if job.raptor:
+            job.retriever = raptor_tree_store.retriever_for(job.document, job.docs)
+        else:
+            job.retriever = build_jina_retriever(job.docs, job.top_k)
+
+
+ingestion_pipeline = IngestionPipeline()
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class LLMResponse:
+    """Response served from the cache, exposing `.content` like the LLM messages."""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class MemoryLLMCacheBackend:
+    """
+    In-process LRU backend of `LLMCache`.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: str, created_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+
+    def prune(self, max_entries: int, expired_before: float) -> None:
+        with self._lock:
+            for key in [key for key, (_, created_at) in self._entries.items() if created_at < expired_before]:
+                del self._entries[key]
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteLLMCacheBackend:
+    """
+    Persistent backend of `LLMCache`, a SQLite table of responses with their creation and
+    last access times.
+
+    Args:
+        path (str): Database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, "
+                               "created_at REAL, accessed_at REAL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return tuple(row) if row else None
+
+    def put(self, key: str, value: str, created_at: float) -> None:
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, created_at, created_at))
+
+    def prune(self, max_entries: int, expired_before: float) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM responses WHERE created_at < ?", (expired_before,))
+            connection.execute("DELETE FROM responses WHERE key NOT IN "
+                               "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)", (max_entries,))
+
+
+class LLMCache:
+    """
+    Cache of the responses of LLM calls that are a function of their prompt, such as
+    titles, jargon checks, critic verdicts and confidence scores.
+
+    Responses are keyed by the sha256 of (model, sampling parameters, rendered prompt)
+    and kept by a pluggable backend: `MemoryLLMCacheBackend` or the persistent
+    `SQLiteLLMCacheBackend`. Entries older than `ttl` seconds are treated as misses,
+    and the least recently used entries are pruned beyond `max_entries`.
+
+    Call sites opt in by making their call through `invoke`, `ainvoke` or `cached` with
+    a site name, under which hits and misses are counted.
+
+    Args:
+        backend: Storage of the responses.
+        ttl (float, optional): Lifetime of a response in seconds. Defaults to 7 days.
+        max_entries (int, optional): Maximum number of stored responses. Defaults to 50000.
+        enabled (bool, optional): When False every call goes to the LLM. Defaults to True.
+    """
+
+    PRUNE_EVERY = 100
+    PARAMS = ("temperature", "top_p", "max_tokens")
+
+    def __init__(self, backend, ttl: float = 7 * 24 * 3600, max_entries: int = 50000, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def model_identity(cls, llm) -> Tuple[str, Dict]:
+        """Return the model name and sampling parameters of an LLM client."""
+        model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+        params = {}
+        for name in cls.PARAMS:
+            value = getattr(llm, name, None)
+            if isinstance(value, (int, float, str)):
+                params[name] = value
+        return str(model), params
+
+    @staticmethod
+    def render(prompt) -> str:
+        """Render a prompt string or a list of chat messages to a string."""
+        if isinstance(prompt, str):
+            return prompt
+        if isinstance(prompt, (list, tuple)):
+            return json.dumps([[getattr(message, "type", ""), str(getattr(message, "content", message))] for message in prompt])
+        return str(prompt)
+
+    @classmethod
+    def make_key(cls, model: str, params: Dict, prompt) -> str:
+        data = json.dumps([model, params, cls.render(prompt)], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def cached(self, site: str, model: str, params: Dict, prompt, compute: Callable[[], str]) -> str:
+        """
+        Return the cached response of a prompt, or compute and cache it.
+
+        Args:
+            site (str): Name of the call site, for the hit rate statistics.
+            model (str): Model the prompt is sent to.
+            params (dict): Sampling parameters of the call.
+            prompt: The prompt, a string or a list of chat messages.
+            compute (Callable[[], str]): Makes the LLM call and returns the response text.
+
+        Returns:
+            str: The response text.
+        """
+        if not self.enabled:
+            return compute()
+        key = self.make_key(model, params, prompt)
+        value = self._get(site, key)
+        if value is None:
+            value = compute()
+            self._put(key, value)
+        return value
+
+    def invoke(self, site: str, llm, prompt):
+        """
+        Cached `llm.invoke(prompt)`. Returns the LLM message on a miss and an `LLMResponse` on a hit.
+        """
+        if not self.enabled:
+            return llm.invoke(prompt)
+        key = self.make_key(*self.model_identity(llm), prompt)
+        value = self._get(site, key)
+        if value is not None:
+            return LLMResponse(value)
+        response = llm.invoke(prompt)
+        self._put(key, response.content)
+        return response
+
+    async def ainvoke(self, site: str, llm, prompt):
+        """
+        Cached `await llm.ainvoke(prompt)`. The backend is read and written on a worker
+        thread, since a SQLite backend may block on other workers' writes.
+        """
+        if not self.enabled:
+            return await llm.ainvoke(prompt)
+        key = self.make_key(*self.model_identity(llm), prompt)
+        value = await asyncio.to_thread(self._get, site, key)
+        if value is not None:
+            return LLMResponse(value)
+        response = await llm.ainvoke(prompt)
+        await asyncio.to_thread(self._put, key, response.content)
+        return response
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Return the hits, misses and hit rate of every call site, and of all of them under "total".
+        """
+        with self._lock:
+            sites = sorted(set(self._hits) | set(self._misses))
+            stats = {}
+            for site in sites + ["total"]:
+                if site == "total":
+                    hits, misses = sum(self._hits.values()), sum(self._misses.values())
+                else:
+                    hits, misses = self._hits.get(site, 0), self._misses.get(site, 0)
+                stats[site] = {"hits": hits, "misses": misses,
+                               "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+            return stats
+
+    def _get(self, site: str, key: str) -> Optional[str]:
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            entry = None
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            entry = None
+        with self._lock:
+            counter = self._hits if entry is not None else self._misses
+            counter[site] = counter.get(site, 0) + 1
+        return entry[0] if entry is not None else None
+
+    def _put(self, key: str, value) -> None:
+        if not isinstance(value, str):
+            return
+        try:
+            self.backend.put(key, value, time.time())
+            with self._lock:
+                self._puts += 1
+                prune = self._puts % self.PRUNE_EVERY == 0
+            if prune:
+                self.backend.prune(self.max_entries, time.time() - self.ttl)
+        except Exception as e:
+            pass
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from rag_agent.bm25 import BM25Index, reciprocal_rank_fusion
+from rag_agent.document_store import DocumentStore
+from rag_agent.utils import CACHE_DIR, PAGE_INDEX_CACHE_SIZE, PAGE_SEARCH, text_embedder, query_embedder
+from rag_agent.vector_index import build_vector_index, search_vector_index
+
+
+class PageIndex:
+    """
+    Page level FAISS index of a single PDF document, with a BM25 index of the same pages.
+
+    In "hybrid" mode (the PAGE_SEARCH default) pages are ranked by the reciprocal-rank
+    fusion of the dense ranking and the BM25 ranking, so pages that literally contain the
+    tickers, line items or fiscal years of a query are not lost to embedding similarity.
+    In "dense" mode only the FAISS ranking is used.
+
+    Attributes:
+        doc_hash (str): Content hash of the document the index was built from.
+        page_texts (List[str]): Text of every page, in page order.
+        embeddings (np.ndarray): float32 matrix of page embeddings, one row per page.
+        index (faiss.Index): FAISS index over `embeddings`, built by `build_vector_index`,
+                             a cosine (inner product) index unless persisted before as flat L2.
+        mode (str): "hybrid" or "dense".
+    """
+
+    RRF_K = 60
+
+    def __init__(self, doc_hash: str, page_texts: List[str], embeddings: np.ndarray, index, mode: str = PAGE_SEARCH):
+        self.doc_hash = doc_hash
+        self.page_texts = page_texts
+        self.embeddings = embeddings
+        self.index = index
+        self.mode = mode
+        self._bm25 = None
+
+    def __len__(self) -> int:
+        return len(self.page_texts)
+
+    @property
+    def bm25(self) -> BM25Index:
+        """BM25 index of the pages, built on first use."""
+        if self._bm25 is None:
+            self._bm25 = BM25Index(self.page_texts)
+        return self._bm25
+
+    def search(self, query: str, top_k: int) -> List[Dict]:
+        """
+        Retrieve the pages most relevant to a query.
+
+        Args:
+            query (str): The query to search pages for.
+            top_k (int): Number of pages to return.
+
+        Returns:
+            List[Dict]: One dict per retrieved page with the keys `page` (1-based page
+                        number as a string), `text`, `distance` (dense distance: 1 - cosine
+                        similarity, or L2 distance for older flat L2 indices) and
+                        `score` (fused score in hybrid mode, None otherwise), best match first.
+        """
+        query_embedding = query_embedder.embed([str(query)])
+        if self.mode != "hybrid":
+            distances, indices = search_vector_index(self.index, query_embedding, min(top_k, len(self)))
+            return [self._result(idx, distance) for idx, distance in zip(indices[0], distances[0]) if idx != -1]
+
+        # Pages are few, so the dense ranking covers all of them
+        distances, indices = search_vector_index(self.index, query_embedding, len(self))
+        dense_ranking = indices[0][indices[0] != -1]
+        page_distances = dict(zip(indices[0], distances[0]))
+
+        fused = reciprocal_rank_fusion([dense_ranking, self.bm25.ranking(str(query))], len(self), self.RRF_K)
+        top = np.argsort(-fused, kind="stable")[:min(top_k, len(self))]
+        return [self._result(idx, page_distances.get(idx), fused[idx]) for idx in top if fused[idx] > 0]
+
+    def _result(self, idx: int, distance, score=None) -> Dict:
+        return {
+            "page": str(idx + 1),
+            "text": self.page_texts[idx],
+            "distance": distance,
+            "score": score,
+        }
+
+    def top_pages(self, query: str, top_k: int) -> List[int]:
+        """
+        Return the 1-based page numbers of the `top_k` pages closest to a query.
+        """
+        return [int(result["page"]) for result in self.search(query, top_k)]
+
+
+class PageIndexStore:
+    """
+    Content-hash keyed store of `PageIndex` objects.
+
+    Page texts, page embeddings and the FAISS index are built once per PDF and kept
+    on disk under `root/<sha256 of the pdf>/`, so later queries, follow-ups and
+    re-evaluations on the same document (or a re-upload of it) reuse them instead of
+    embedding every page again. Only the `max_indices` most recently used indices are
+    kept in memory; older ones are reloaded from disk when asked for again.
+
+    Args:
+        root (str, optional): Directory the indices are persisted to.
+                              Defaults to `<RAG_CACHE_DIR>/page_index`.
+        max_indices (int, optional): Number of indices kept in memory.
+                                     Defaults to PAGE_INDEX_CACHE_SIZE.
+    """
+
+    PAGES_FILE = "pages.json"
+    EMBEDDINGS_FILE = "embeddings.npy"
+    INDEX_FILE = "index.faiss"
+    LOCK_STRIPES = 64
+
+    def __init__(self, root: Optional[str] = None, max_indices: int = PAGE_INDEX_CACHE_SIZE):
+        self.root = root or os.path.join(CACHE_DIR, "page_index")
+        self.max_indices = max_indices
+        self._indices = OrderedDict()
+        # Builds of the same document are serialized on a fixed set of lock stripes,
+        # so the locks don't grow with the number of documents seen
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._lock = threading.Lock()
+
+    def get(self, document: DocumentStore) -> PageIndex:
+        """
+        Return the page index of a PDF, loading it from disk or building it if needed.
+
+        Args:
+            document (DocumentStore): The document, as returned by `open_document`.
+
+        Returns:
+            PageIndex: The page index of the document.
+        """
+        doc_hash = document.doc_hash
+        page_index = self._cached(doc_hash)
+        if page_index is not None:
+            return page_index
+
+        with self._locks[int(doc_hash[:8], 16) % self.LOCK_STRIPES]:
+            page_index = self._cached(doc_hash)
+            if page_index is None:
+                page_index = self._load(doc_hash)
+            if page_index is None:
+                page_index = self._build(document)
+                self._save(page_index)
+            self._remember(page_index)
+        return page_index
+
+    def _cached(self, doc_hash: str) -> Optional[PageIndex]:
+        with self._lock:
+            page_index = self._indices.get(doc_hash)
+            if page_index is not None:
+                self._indices.move_to_end(doc_hash)
+            return page_index
+
+    def _remember(self, page_index: PageIndex) -> None:
+        with self._lock:
+            self._indices[page_index.doc_hash] = page_index
+            self._indices.move_to_end(page_index.doc_hash)
+            while len(self._indices) > self.max_indices:
+                self._indices.popitem(last=False)
+
+    def _path(self, doc_hash: str) -> str:
+        return os.path.join(self.root, doc_hash)
+
+    def _build(self, document: DocumentStore) -> PageIndex:
+        page_texts = document.page_texts()
+
+        embeddings = text_embedder.embed(page_texts)
+        index = build_vector_index(embeddings, name="page_index")
+        return PageIndex(document.doc_hash, page_texts, embeddings, index)
+
+    def _save(self, page_index: PageIndex) -> None:
+        path = self._path(page_index.doc_hash)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            with open(os.path.join(tmp_path, self.PAGES_FILE), "w") as f:
+                json.dump(page_index.page_texts, f)
+            np.save(os.path.join(tmp_path, self.EMBEDDINGS_FILE), page_index.embeddings)
+            faiss.write_index(page_index.index, os.path.join(tmp_path, self.INDEX_FILE))
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _load(self, doc_hash: str) -> Optional[PageIndex]:
+        path = self._path(doc_hash)
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, self.PAGES_FILE), "r") as f:
+                page_texts = json.load(f)
+            embeddings = np.load(os.path.join(path, self.EMBEDDINGS_FILE))
+            index = faiss.read_index(os.path.join(path, self.INDEX_FILE))
+            return PageIndex(doc_hash, page_texts, embeddings, index)
+        except Exception as e:
+            return None
+
+
+page_index_store = PageIndexStore()
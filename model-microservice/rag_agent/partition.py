@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from unstructured_client.models import operations, shared
+
+from rag_agent.document_store import DocumentStore
+from rag_agent.utils import CACHE_DIR, client_unstructured
+
+PARTITION_WORKERS = int(os.getenv("PARTITION_WORKERS", 8))
+PARTITION_CACHE_PAGES = int(os.getenv("PARTITION_CACHE_PAGES", 2048))
+
+logger = logging.getLogger(__name__)
+
+
+class PagePartitioner:
+    """
+    Page granular, cached front end to the Unstructured partition API.
+
+    Every page is sent as its own request on a bounded thread pool, and the elements
+    returned for a page are cached on disk under `root/<pdf hash>/<strategy>/<page>.json`
+    and, for the `max_cached_pages` most recently used pages, in memory. A later question
+    that selects pages already seen needs no partition call at all. Failed pages are
+    never cached, so asking for them again retries the request.
+
+    Args:
+        client (UnstructuredClient, optional): Unstructured API client. Defaults to `client_unstructured`.
+        root (str, optional): Directory of the on-disk cache. Defaults to `<RAG_CACHE_DIR>/partitions`.
+        max_workers (int, optional): Maximum number of concurrent partition requests.
+                                     Defaults to PARTITION_WORKERS.
+        max_cached_pages (int, optional): Number of pages whose elements are kept in memory.
+                                          Defaults to PARTITION_CACHE_PAGES.
+    """
+
+    def __init__(self, client=None, root: Optional[str] = None, max_workers: int = PARTITION_WORKERS,
+                 max_cached_pages: int = PARTITION_CACHE_PAGES):
+        self.client = client or client_unstructured
+        self.root = root or os.path.join(CACHE_DIR, "partitions")
+        self.max_cached_pages = max_cached_pages
+        self.request_count = 0
+        self.failure_count = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="partition")
+        self._elements = OrderedDict()
+        self._lock = threading.Lock()
+
+    def partition(self, document: DocumentStore, page_numbers: List[int],
+                  strategy=shared.Strategy.HI_RES) -> Dict[int, List[Dict]]:
+        """
+        Partition the given pages of a PDF.
+
+        Args:
+            document (DocumentStore): The document, as returned by `open_document`.
+            page_numbers (List[int]): 1-based numbers of the pages to partition.
+            strategy (shared.Strategy, optional): Unstructured partition strategy. Defaults to HI_RES.
+
+        Returns:
+            Dict[int, Optional[List[Dict]]]: The elements of every page, keyed by page number in
+                                   the order of `page_numbers`. The `page_number` metadata of each
+                                   element is the page number in the original document.
+                                   Pages whose request failed map to None, so they can be
+                                   told apart from empty pages and partitioned again.
+        """
+        doc_hash = document.doc_hash
+        strategy_name = getattr(strategy, "value", str(strategy))
+        page_numbers = list(dict.fromkeys(page_numbers))
+
+        results = {}
+        missing = []
+        for page_number in page_numbers:
+            elements = self._cached(doc_hash, strategy_name, page_number)
+            if elements is None:
+                missing.append(page_number)
+            else:
+                results[page_number] = elements
+
+        if missing:
+            futures = {
+                page_number: self._executor.submit(
+                    self._partition_page, document.page_pdf(page_number), page_number, strategy
+                )
+                for page_number in missing
+            }
+            for page_number, future in futures.items():
+                try:
+                    elements = future.result()
+                except Exception as e:
+                    self.failure_count += 1
+                    logger.warning("Partitioning page %s of %s failed: %s", page_number, doc_hash, e)
+                    results[page_number] = None
+                    continue
+                self._store(doc_hash, strategy_name, page_number, elements)
+                results[page_number] = elements
+
+        return {page_number: results[page_number] for page_number in page_numbers}
+
+    def _partition_page(self, data: bytes, page_number: int, strategy) -> List[Dict]:
+        req = operations.PartitionRequest(partition_parameters=shared.PartitionParameters(
+            files=shared.Files(content=data, file_name=f"page_{page_number}.pdf"),
+            strategy=strategy, languages=['eng'],
+        ))
+        res = self.client.general.partition(request=req)
+        self.request_count += 1
+
+        elements = [dict(element) for element in res.elements]
+        for element in elements:
+            element["metadata"] = dict(element.get("metadata") or {})
+            element["metadata"]["page_number"] = page_number
+        return elements
+
+    def _path(self, doc_hash: str, strategy_name: str, page_number: int) -> str:
+        return os.path.join(self.root, doc_hash, strategy_name, f"{page_number}.json")
+
+    def _cached(self, doc_hash: str, strategy_name: str, page_number: int) -> Optional[List[Dict]]:
+        key = (doc_hash, strategy_name, page_number)
+        with self._lock:
+            elements = self._elements.get(key)
+            if elements is not None:
+                self._elements.move_to_end(key)
+                return elements
+
+        path = self._path(doc_hash, strategy_name, page_number)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                elements = json.load(f)
+        except Exception as e:
+            return None
+        self._remember(key, elements)
+        return elements
+
+    def _remember(self, key, elements: List[Dict]) -> None:
+        with self._lock:
+            self._elements[key] = elements
+            self._elements.move_to_end(key)
+            while len(self._elements) > self.max_cached_pages:
+                self._elements.popitem(last=False)
+
+    def _store(self, doc_hash: str, strategy_name: str, page_number: int, elements: List[Dict]) -> None:
+        self._remember((doc_hash, strategy_name, page_number), elements)
+
+        path = self._path(doc_hash, strategy_name, page_number)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(elements, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+page_partitioner = PagePartitioner()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.packs.raptor import RaptorRetriever
+
+from rag_agent.document_store import DocumentStore
+from rag_agent.utils import CACHE_DIR, RAPTOR_TREE_CACHE_SIZE, llm, text_embed_model
+
+
+def new_raptor_retriever(existing_index=None) -> RaptorRetriever:
+    """
+    Create an empty collapsed-mode RAPTOR retriever, optionally over an existing index.
+    """
+    return RaptorRetriever([], embed_model=text_embed_model,
+        llm=llm, similarity_top_k=2, mode="collapsed",
+        transformations=[SentenceSplitter(chunk_size=900, chunk_overlap=200)],
+        existing_index=existing_index)
+
+
+class RaptorTree:
+    """
+    RAPTOR tree of one document and the pages it covers.
+
+    Attributes:
+        doc_hash (str): Content hash of the document.
+        retriever (RaptorRetriever): Retriever over the tree. Its index holds every leaf
+                                     chunk, cluster summary and level with their embeddings.
+        pages (List[str]): `page_number` metadata of every page inserted into the tree.
+    """
+
+    def __init__(self, doc_hash: str, retriever: RaptorRetriever, pages: Optional[List[str]] = None):
+        self.doc_hash = doc_hash
+        self.retriever = retriever
+        self.pages = list(pages or [])
+        self.lock = threading.Lock()
+
+
+class RaptorTreeStore:
+    """
+    Content-hash keyed store of RAPTOR trees.
+
+    Every document has a single tree that grows as pages are selected by queries,
+    re-evaluations or ingestion. Pages missing from the tree are added in one batch
+    through `RaptorRetriever.insert`, which clusters and summarizes only the new pages
+    into their own subtrees and leaves the existing levels untouched. The tree is
+    persisted to `root/<sha256 of the pdf>/` after every insert and loaded from there
+    by later sessions, instead of being rebuilt. Only the `max_trees` most recently used
+    trees are kept in memory; older ones are reloaded from disk when asked for again.
+    A tree with an insert in progress is not evicted.
+
+    Args:
+        root (str, optional): Directory the trees are persisted to. Defaults to `<RAG_CACHE_DIR>/raptor`.
+        max_trees (int, optional): Number of trees kept in memory. Defaults to RAPTOR_TREE_CACHE_SIZE.
+    """
+
+    PAGES_FILE = "pages.json"
+
+    def __init__(self, root: Optional[str] = None, max_trees: int = RAPTOR_TREE_CACHE_SIZE):
+        self.root = root or os.path.join(CACHE_DIR, "raptor")
+        self.max_trees = max_trees
+        self._trees: Dict[str, RaptorTree] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, document: DocumentStore) -> RaptorTree:
+        """
+        Return the tree of a PDF, loading it from disk or starting an empty one.
+        """
+        doc_hash = document.doc_hash
+        with self._lock:
+            tree = self._trees.get(doc_hash)
+            if tree is None:
+                tree = self._load(doc_hash) or RaptorTree(doc_hash, new_raptor_retriever())
+                self._trees[doc_hash] = tree
+            self._trees.move_to_end(doc_hash)
+            self._evict()
+            return tree
+
+    def _evict(self) -> None:
+        # Drop the least recently used idle trees beyond max_trees
+        excess = len(self._trees) - self.max_trees
+        idle = [doc_hash for doc_hash, tree in self._trees.items() if not tree.lock.locked()]
+        for doc_hash in idle[:max(excess, 0)]:
+            del self._trees[doc_hash]
+
+    def retriever_for(self, document: DocumentStore, docs: List) -> RaptorRetriever:
+        """
+        Return the retriever of a PDF's tree, after making sure it covers `docs`.
+
+        Args:
+            document (DocumentStore): The document, as returned by `open_document`.
+            docs (List[Document]): Page documents with a `page_number` metadata, as returned by `page_docs`.
+
+        Returns:
+            RaptorRetriever: The retriever of the document's tree.
+        """
+        tree = self.get(document)
+        self.insert(tree, docs)
+        return tree.retriever
+
+    def insert(self, tree: RaptorTree, docs: List) -> int:
+        """
+        Insert the pages of `docs` that the tree does not cover yet, in one batch.
+
+        Returns:
+            int: Number of pages inserted.
+        """
+        with tree.lock:
+            covered = set(tree.pages)
+            new_docs = []
+            for doc in docs:
+                page = doc.metadata.get("page_number")
+                if page not in covered:
+                    covered.add(page)
+                    new_docs.append(doc)
+            if not new_docs:
+                return 0
+
+            asyncio.run(tree.retriever.insert(new_docs))
+            tree.pages.extend(doc.metadata.get("page_number") for doc in new_docs)
+            self._save(tree)
+            return len(new_docs)
+
+    def _path(self, doc_hash: str) -> str:
+        return os.path.join(self.root, doc_hash)
+
+    def _save(self, tree: RaptorTree) -> None:
+        path = self._path(tree.doc_hash)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            tree.retriever.index.storage_context.persist(persist_dir=tmp_path)
+            with open(os.path.join(tmp_path, self.PAGES_FILE), "w") as f:
+                json.dump(tree.pages, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _load(self, doc_hash: str) -> Optional[RaptorTree]:
+        path = self._path(doc_hash)
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, self.PAGES_FILE), "r") as f:
+                pages = json.load(f)
+            storage_context = StorageContext.from_defaults(persist_dir=path)
+            index = load_index_from_storage(storage_context, embed_model=text_embed_model,
+                transformations=[SentenceSplitter(chunk_size=900, chunk_overlap=200)])
+            return RaptorTree(doc_hash, new_raptor_retriever(existing_index=index), pages)
+        except Exception as e:
+            return None
+
+
+raptor_tree_store = RaptorTreeStore()
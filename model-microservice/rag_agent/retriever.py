@@ -1,278 +1,207 @@
-import faiss
-import json
-import os
-import fitz
-import numpy as np
-from llama_index.core import Document
-from llama_index.packs.raptor import RaptorRetriever
-from llama_index.core.node_parser import SentenceSplitter
-from PyPDF2 import PdfReader, PdfWriter
-from unstructured_client.models import operations, shared
-# from rag_agent.summary_module import summary_module
-from llama_index.core import (
-    SimpleDirectoryReader,
-    load_index_from_storage,
-    VectorStoreIndex,
-    StorageContext,
-)
-from llama_index.core import Document
-from llama_index.vector_stores.faiss import FaissVectorStore
-from IPython.display import Markdown, display
-from llama_index.core.node_parser import TokenTextSplitter
-import fitz 
-import numpy as np
-from llama_index.core import Settings
-import re
-from io import BytesIO
-import time
-
-from rag_agent.utils import client_table, text_embed_model, query_embed_model, client_unstructured, llm
-
-def table_summary(html_code):
-    """
-    Generate a concise summary of a table from its HTML representation.
-
-    This function uses a large language model to create a retrieval-optimized 
-    summary of a table, preserving all critical information including numerical data.
-
-    Args:
-        html_code (str): The HTML code representing the table to be summarized.
-
-    Returns:
-        str: A concise, information-rich summary of the table content.
-
-    Example:
-        >>> html_table = "<table>...</table>"
-        >>> summary = table_summary(html_table)
-        >>> print(summary)
-        'Table summary with key insights...'
-    """
-    
-    prompt_text = f"""You are an assistant tasked with summarizing tables for retrieval. \
-    These summaries will be embedded and used to retrieve the raw table elements. \
-    You will be given with html code of table, you have to return concise summary of table (without lossing any information , including numerical), well optimized for retrieval. Table:{html_code} Summary:"""
-
-    summary = client_table.chat.completions.create(
-        model="llama-3.1-70b-versatile",
-        messages=[{"role": "user", "content": prompt_text}],
-        temperature=0.7,
-        top_p=0.9,
-        stream=False
-    )
-    return summary.choices[0].message.content
-
-def jina_retriever(pdf_content, query, top_k):
-    # pass
-  pdf_document = fitz.open(stream=BytesIO(pdf_content), filetype="pdf")
-
-  metadata = {}
-  for page_num in range(len(pdf_document)):
-      page_metadata = {"text": ""}
-      page = pdf_document[page_num]
-
-      page_text = page.get_text()
-      page_metadata["text"] = page_text
-
-      metadata[f"page_{page_num + 1}"] = page_metadata
-
-  pdf_document.close()
-
-  #constructing a FAISS vector store for text-based doc level retrieval.
-  dimension = 1024
-  index = faiss.IndexFlatL2(dimension)
-  faiss_metadata = []
-  count = 1
-  for page, content in metadata.items():
-      page_text = content["text"]
-      page_embedding = text_embed_model.get_text_embedding(page_text)
-      page_embedding = np.array([page_embedding], dtype="float32")
-      index.add(page_embedding)
-      faiss_metadata.append({
-          "page": page.split("_")[-1],
-          "text": page_text
-      })
-      count += 1
-
-  query_embedding = query_embed_model.get_query_embedding(query)
-  query_embedding = np.array([query_embedding], dtype="float32")
-  distances, indices = index.search(query_embedding, top_k)
-
-  #doc level retrieval
-
-  results = []
-  for idx, distance in zip(indices[0], distances[0]):
-      if idx == -1:
-          continue
-      result_metadata = faiss_metadata[idx]
-      result_metadata["distance"] = distance
-      results.append(result_metadata)
-
-  gt_num=[]
-  for result in results:
-    num = int(re.search(r'\d+', result['page']).group())
-    gt_num.append(num)
-
-  writer = PdfWriter()
-  input_pdf  = PdfReader(BytesIO(pdf_content))
-  for i in gt_num:
-    writer.add_page(input_pdf.pages[i-1])
-
-  output_pdf_stream = BytesIO()
-  writer.write(output_pdf_stream)
-  output_pdf_stream.seek(0) 
-
-  data = output_pdf_stream.read()
-  req = operations.PartitionRequest(partition_parameters=shared.PartitionParameters(files=shared.Files( content=data, file_name="temp.pdf") , strategy=shared.Strategy.HI_RES, languages=['eng'], ))
-  try:
-    res = client_unstructured.general.partition(request=req)
-  except Exception as e:
-    pass
-
-  page_text = ""
-  for element in res.elements:
-
-      if element['type'] == 'Table':
-          html = element["metadata"]["text_as_html"]
-          text = table_summary(html)
-          time.sleep(1)
-          pdf_text += f" \n{text}\n"
-
-      elif element['type'] == 'Title':
-          text = element["text"]
-          pdf_text += f"\n{text}\n"
-      else :
-          text = element["text"]
-          pdf_text += f"  {text}"
-  
-  d = 1024  
-  faiss_index2 = faiss.IndexFlatL2(d)
-  vector_store = FaissVectorStore(faiss_index=faiss_index2)
-  storage_context = StorageContext.from_defaults(vector_store=vector_store)
-  
-  splitter = TokenTextSplitter(chunk_size=900,chunk_overlap=200)
-  chunks = splitter.split_text(pdf_text)
-  documents = []
-  for chunk in chunks:
-    embedding = text_embed_model.get_text_embedding(chunk)  
-    documents.append(Document(text=chunk, embedding=embedding))
-
-  Settings.embed_model = text_embed_model
-  index2 = VectorStoreIndex.from_documents(documents, storage_context=storage_context,)
-  
-  retriever = index2.as_retriever(top_k=top_k)
-  return retriever
-
-def raptor_retriever(pdf_content, query, top_k):
-  """
-    Retrieve and process relevant pages from a PDF document based on a semantic query.
-
-    This function extracts text and metadata from a PDF document, constructs a FAISS-based vector index for semantic search, and processes retrieved content. It returns a `RaptorRetriever` object for performing advanced semantic queries.
-
-    Args:
-        path (str): File path to the input PDF document.
-        query (str): Semantic query to search within the document.
-        top_k (int): Number of top-k most relevant pages to retrieve.
-
-    Returns:
-        RaptorRetriever: A query engine equipped to perform semantic search over the document.
-
-    Raises:
-        FileNotFoundError: If the specified PDF file does not exist.
-        ValueError: If the query is empty or top_k is not a positive integer.
-
-    Example:
-        >>> query_engine = retriever('document.pdf', 'research methodology', top_k=3)
-        >>> response = query_engine.query("Summarize the key findings")
-  """
-  pdf_document = fitz.open(stream=BytesIO(pdf_content), filetype="pdf")
-
-  metadata = {}
-  for page_num in range(len(pdf_document)):
-      page_metadata = {"text": ""}
-      page = pdf_document[page_num]
-
-      page_text = page.get_text()
-      page_metadata["text"] = page_text
-
-      metadata[f"page_{page_num + 1}"] = page_metadata
-
-  pdf_document.close()
-
-  #constructing a FAISS vector store for text-based doc level retrieval.
-  dimension = 1024
-  index = faiss.IndexFlatL2(dimension)
-  faiss_metadata = []
-  count = 1
-  for page, content in metadata.items():
-      page_text = content["text"]
-      page_embedding = text_embed_model.get_text_embedding(page_text)
-      page_embedding = np.array([page_embedding], dtype="float32")
-      index.add(page_embedding)
-      faiss_metadata.append({
-          "page": page.split("_")[-1],
-          "text": page_text
-      })
-      count += 1
-
-  query_embedding = query_embed_model.get_query_embedding(query)
-  query_embedding = np.array([query_embedding], dtype="float32")
-  distances, indices = index.search(query_embedding, top_k)
-
-  #doc level retrieval
-
-  results = []
-  for idx, distance in zip(indices[0], distances[0]):
-      if idx == -1:
-          continue
-      result_metadata = faiss_metadata[idx]
-      result_metadata["distance"] = distance
-      results.append(result_metadata)
-
-  gt_num=[]
-  for result in results:
-    num = int(re.search(r'\d+', result['page']).group())
-    gt_num.append(num)
-
-  #re-writing the pages to a pdf since it is the expected input format of Unstructured.
-
-  writer = PdfWriter()
-  input_pdf  = PdfReader(BytesIO(pdf_content))
-  for i in gt_num:
-    writer.add_page(input_pdf.pages[i-1])
-
-  output_pdf_stream = BytesIO()
-  writer.write(output_pdf_stream)
-  output_pdf_stream.seek(0)  # Reset the stream position for reading
-
-  data = output_pdf_stream.read()
-  req = operations.PartitionRequest(partition_parameters=shared.PartitionParameters(files=shared.Files( content=data, file_name="temp.pdf") , strategy=shared.Strategy.HI_RES, languages=['eng'], ))
-  try:
-    res = client_unstructured.general.partition(request=req)
-  except Exception as e:
-    pass
-
-  page_metadata={}
-  for element in res.elements:
-
-      page_num = element["metadata"]["page_number"]
-      if page_metadata.get(f"page_{page_num}", None) is None:
-          page_metadata[f"page_{page_num}"] = ""
-
-      if element['type'] == 'Table':
-          html = element["metadata"]["text_as_html"]
-          text = table_summary(html)
-          time.sleep(1)
-          page_metadata[f"page_{page_num}"] += f" \n{text}\n"
-
-      elif element['type'] == 'Title':
-          text = element["text"]
-          page_metadata[f"page_{page_num}"] += f"\n{text}\n"
-      else :
-          text = element["text"]
-          page_metadata[f"page_{page_num}"] += f"  {text}"
-  docs = [Document(text=content, metadata={"page_number": page_num})
-        for page_num, content in page_metadata.items()]
-  retriever = RaptorRetriever(docs,embed_model=text_embed_model,
-        llm=llm, similarity_top_k=2,mode="collapsed",
-        transformations=[SentenceSplitter(chunk_size=900, chunk_overlap=200)],)
-  return retriever
\ No newline at end of file
+import asyncio
+import faiss
+import json
+import os
+import time
+import fitz
+import numpy as np
+from llama_index.core import Document
+from llama_index.packs.raptor import RaptorRetriever
+from llama_index.core.node_parser import SentenceSplitter
+# from rag_agent.summary_module import summary_module
+from llama_index.core import (
+    SimpleDirectoryReader,
+    load_index_from_storage,
+    VectorStoreIndex,
+    StorageContext,
+)
+from llama_index.core import Document
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.faiss import FaissVectorStore
+from IPython.display import Markdown, display
+from llama_index.core.node_parser import TokenTextSplitter
+import fitz 
+import numpy as np
+from llama_index.core import Settings
+import re
+from io import BytesIO
+
+from rag_agent.utils import client_table, text_embed_model, query_embed_model, llm, text_embedder
+from rag_agent.page_index import page_index_store
+from rag_agent.vector_index import new_vector_index, normalized, report_index
+from rag_agent.partition import page_partitioner
+from rag_agent.raptor_store import raptor_tree_store
+from rag_agent.table_summarizer import table_summary, table_summarizer
+
+def page_texts_from_elements(elements_by_page):
+  """
+    Flatten the partitioned elements of every page into one text per page.
+
+    Tables are replaced by their summary (all tables of all pages are summarized
+    concurrently through `table_summarizer`), titles are put on their own line and
+    every other element is appended to the running page text.
+
+    Args:
+        elements_by_page (Dict[int, Optional[List[Dict]]]): Unstructured elements keyed by 1-based page
+                                                  number, as returned by `page_partitioner.partition`.
+                                                  Failed (None) pages get an empty text.
+
+    Returns:
+        Dict[str, str]: Text of every page, keyed by `page_<number>`, in the order of the input.
+  """
+  tables = [element["metadata"]["text_as_html"]
+            for elements in elements_by_page.values()
+            for element in elements or [] if element['type'] == 'Table']
+  summaries = iter(table_summarizer.summarize_many(tables))
+
+  page_metadata = {}
+  for page_num, elements in elements_by_page.items():
+      page_metadata[f"page_{page_num}"] = ""
+
+      for element in elements or []:
+          if element['type'] == 'Table':
+              text = next(summaries)
+              page_metadata[f"page_{page_num}"] += f" \n{text}\n"
+
+          elif element['type'] == 'Title':
+              text = element["text"]
+              page_metadata[f"page_{page_num}"] += f"\n{text}\n"
+          else :
+              text = element["text"]
+              page_metadata[f"page_{page_num}"] += f"  {text}"
+  return page_metadata
+
+def retrieve_page_docs(document, query, top_k):
+  """
+    Select the `top_k` pages of a PDF closest to a query and return their partitioned text.
+
+    Each selected page is partitioned by Unstructured as its own concurrent request, and
+    pages partitioned before (for any query on the same document) are served from cache.
+
+    Args:
+        document (DocumentStore): The document, as returned by `open_document`.
+        query (str): Query used to select the pages.
+        top_k (int): Number of pages to select.
+
+    Returns:
+        List[Document]: One document per selected page, with the page number in its metadata.
+  """
+  gt_num = page_index_store.get(document).top_pages(query, top_k)
+  return page_docs(document, gt_num)
+
+def partition_pages(document, page_numbers):
+  """
+    Partition the given pages of a PDF, retrying once the pages whose request failed.
+
+    Args:
+        document (DocumentStore): The document, as returned by `open_document`.
+        page_numbers (List[int]): 1-based numbers of the pages.
+
+    Returns:
+        Dict[int, Optional[List[Dict]]]: As `page_partitioner.partition`; pages that failed
+                                         twice still map to None.
+  """
+  elements_by_page = page_partitioner.partition(document, page_numbers)
+  failed = [page_number for page_number, elements in elements_by_page.items() if elements is None]
+  if failed:
+    elements_by_page.update(page_partitioner.partition(document, failed))
+  return elements_by_page
+
+def page_docs(document, page_numbers):
+  """
+    Partition the given pages of a PDF and return one document per non-empty page.
+
+    Args:
+        document (DocumentStore): The document, as returned by `open_document`.
+        page_numbers (List[int]): 1-based numbers of the pages.
+
+    Returns:
+        List[Document]: One document per page, with `page_<number>` as its `page_number` metadata.
+  """
+  page_metadata = page_texts_from_elements(partition_pages(document, page_numbers))
+  return [Document(text=content, metadata={"page_number": page_num})
+          for page_num, content in page_metadata.items() if content]
+
+def jina_retriever(document, query, top_k):
+    # pass
+  docs = retrieve_page_docs(document, query, top_k)
+  return build_jina_retriever(docs, top_k)
+
+def build_jina_retriever(docs, top_k):
+  """
+    Build a chunk level FAISS retriever over page documents.
+
+    Args:
+        docs (List[Document]): Page documents, as returned by `page_docs`.
+        top_k (int): Number of chunks to retrieve per query.
+
+    Returns:
+        BaseRetriever: Retriever over the token chunks of the concatenated pages.
+  """
+  pdf_text = "".join(doc.text for doc in docs)
+  
+  d = 1024  
+  splitter = TokenTextSplitter(chunk_size=900,chunk_overlap=200)
+  chunks = splitter.split_text(pdf_text)
+  embeddings = text_embedder.embed(chunks)
+
+  # Index kind and parameters are chosen by the number of chunks (see VECTOR_INDEX)
+  start = time.perf_counter()
+  faiss_index2 = new_vector_index(d, len(chunks))
+  if len(chunks) and faiss_index2.metric_type == faiss.METRIC_INNER_PRODUCT:
+    embeddings = normalized(embeddings)
+  if len(chunks) and not faiss_index2.is_trained:
+    faiss_index2.train(embeddings)
+  vector_store = FaissVectorStore(faiss_index=faiss_index2)
+  storage_context = StorageContext.from_defaults(vector_store=vector_store)
+  # Nodes carrying their (normalized) embedding are indexed as is: neither re-split
+  # nor re-embedded, so the index holds exactly the vectors its recall is measured on
+  nodes = [TextNode(text=chunk, embedding=embedding.tolist())
+           for chunk, embedding in zip(chunks, embeddings)]
+
+  Settings.embed_model = text_embed_model
+  index2 = VectorStoreIndex(nodes, storage_context=storage_context)
+  report_index("jina_chunks", faiss_index2, embeddings, time.perf_counter() - start)
+  
+  retriever = index2.as_retriever(top_k=top_k)
+  return retriever
+
+def raptor_retriever(document, query, top_k):
+  """
+    Retrieve and process relevant pages from a PDF document based on a semantic query.
+
+    This function extracts text and metadata from a PDF document, constructs a FAISS-based vector index for semantic search, and processes retrieved content. It returns a `RaptorRetriever` object for performing advanced semantic queries.
+
+    The RAPTOR tree of a document is persisted and shared through `raptor_tree_store`, so only
+    selected pages that the tree does not cover yet are clustered and summarized.
+
+    Args:
+        document (DocumentStore): The document, as returned by `open_document`.
+        query (str): Semantic query to search within the document.
+        top_k (int): Number of top-k most relevant pages to retrieve.
+
+    Returns:
+        RaptorRetriever: A query engine equipped to perform semantic search over the document.
+
+    Raises:
+        FileNotFoundError: If the specified PDF file does not exist.
+        ValueError: If the query is empty or top_k is not a positive integer.
+
+    Example:
+        >>> query_engine = retriever('document.pdf', 'research methodology', top_k=3)
+        >>> response = query_engine.query("Summarize the key findings")
+  """
+  docs = retrieve_page_docs(document, query, top_k)
+  return raptor_tree_store.retriever_for(document, docs)
+
+async def ajina_retriever(document, query, top_k):
+  """
+    Async variant of `jina_retriever`. Page selection, partitioning and indexing run in a worker thread.
+  """
+  return await asyncio.to_thread(jina_retriever, document, query, top_k)
+
+async def araptor_retriever(document, query, top_k):
+  """
+    Async variant of `raptor_retriever`. Page selection, partitioning and tree inserts run in a worker thread.
+  """
+  return await asyncio.to_thread(raptor_retriever, document, query, top_k)
\ No newline at end of file
@@ -0,0 +1,279 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from rag_agent.default_tools import TOOL_MAP, TOOL_REGISTRY
+from rag_agent.dynamic_cache_index import DynamicCacheIndex
+from rag_agent.session_store import SessionConflict, SessionStore, create_session_store
+from rag_agent.supervisor import SUPERVISOR_AGENT
+from rag_agent.utils import SESSION_MEMORY_BYTES, chat_llm
+
+logger = logging.getLogger(__name__)
+
+# Rough footprint of a supervisor besides its PDF and memory cache: both agents, their
+# prompts, tool maps and the conversation memory.
+SESSION_OVERHEAD_BYTES = 4 * 1024 * 1024
+
+
+def session_size(supervisor: SUPERVISOR_AGENT) -> int:
+    """
+    Estimate the memory held by a supervisor, in bytes.
+
+    Counts the PDF bytes, the vectors and texts of the memory cache index, the chat logs
+    and a fixed overhead.
+    """
+    size = SESSION_OVERHEAD_BYTES + len(supervisor.pdf_content or b"")
+    cache_index = supervisor.agent.cache_index
+    size += cache_index.embeddings.data.nbytes + cache_index.query_embeddings.data.nbytes
+    size += sum(len(text) for text in cache_index.metadata.texts.texts)
+    size += sum(len(query) + len(response) for query, response in supervisor.logs)
+    return size
+
+
+class SessionManager:
+    """
+    Store of the chat sessions (`SUPERVISOR_AGENT` objects) of all users.
+
+    The state of every session lives in a shared `SessionStore`, and this process keeps
+    the supervisors it served in an LRU ordered dict keyed by `(id, chat_id)`, so lookups
+    are O(1). Every request that changes a session writes its state back to the store
+    (write-through), and a session held in memory is reloaded when the store has a newer
+    version, so several worker processes can serve the same chats.
+
+    When the estimated size of the sessions in memory goes over `memory_budget`, the
+    least recently used ones are dropped. They are rehydrated from the store by the next
+    request that needs them. Sessions in use by a request are pinned and never evicted.
+
+    If another worker saved a session after it was loaded here, the save of this copy is
+    refused: the copy is dropped and `release` raises `SessionConflict`, so the client
+    knows its turn was not kept.
+
+    Args:
+        store (SessionStore, optional): Shared session store. Defaults to the store selected by SESSION_STORE.
+        memory_budget (int, optional): Bytes of sessions kept in memory. Defaults to SESSION_MEMORY_BYTES.
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None, memory_budget: int = SESSION_MEMORY_BYTES):
+        self.store = store or create_session_store()
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.evictions = 0
+        self.rehydrations = 0
+        self.conflicts = 0
+        self._sessions: "OrderedDict[Tuple[str, str], SUPERVISOR_AGENT]" = OrderedDict()
+        self._sizes: Dict[Tuple[str, str], int] = {}
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._dirty = set()
+        self._pins: Dict[Tuple[str, str], int] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, id: str, chat_id: str, url: Optional[str] = None) -> Tuple[Optional[SUPERVISOR_AGENT], bool]:
+        """
+        Return the pinned supervisor of a chat, loading it from the store if it is not in
+        memory or another worker saved a newer version.
+
+        Every call has to be followed by a call to `release`, also when None is returned.
+
+        Args:
+            id (str): Id of the user.
+            chat_id (str): Id of the chat.
+            url (str, optional): Url of the chat's PDF. If given, a new supervisor is created
+                                 for a chat that has no session.
+
+        Returns:
+            Tuple[Optional[SUPERVISOR_AGENT], bool]: The supervisor, or None if the chat has no
+                                                     session and no url was given, and whether it was just created.
+        """
+        key = (id, chat_id)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                with self._lock:
+                    supervisor = self._touch(key)
+                if supervisor is not None:
+                    if key in self._dirty or self.store.version(id, chat_id) == self._versions.get(key, 0):
+                        return supervisor, False
+                    self._drop(key)
+
+                created = False
+                supervisor = self._rehydrate(id, chat_id)
+                if supervisor is None and url is not None:
+                    supervisor = SUPERVISOR_AGENT(TOOL_REGISTRY, None, chat_llm, TOOL_MAP, url, chat_id)
+                    self._restore_cache_index(supervisor, id, chat_id)
+                    self.store.register(id, chat_id, {"chat_id": chat_id, "pdf_title": supervisor.pdf_title, "url": supervisor.url})
+                    created = True
+                if supervisor is None:
+                    return None, False
+
+                with self._lock:
+                    self._sessions[key] = supervisor
+                    self._resize(key, session_size(supervisor))
+                    if created:
+                        self._dirty.add(key)
+                return supervisor, created
+        except Exception:
+            self.release(id, chat_id, write=False)
+            raise
+
+    def release(self, id: str, chat_id: str, write: bool = True) -> None:
+        """
+        Unpin the supervisor of a chat and, if the request may have changed it, save it to
+        the store. Then evict sessions while over the memory budget.
+
+        Args:
+            id (str): Id of the user.
+            chat_id (str): Id of the chat.
+            write (bool, optional): Whether the request may have changed the session. Defaults to True.
+
+        Raises:
+            SessionConflict: If another worker saved the session since it was loaded.
+        """
+        key = (id, chat_id)
+        with self._lock:
+            pins = self._pins.get(key, 0) - 1
+            if pins > 0:
+                self._pins[key] = pins
+            else:
+                self._pins.pop(key, None)
+            supervisor = self._sessions.get(key)
+            if supervisor is not None:
+                if write:
+                    self._dirty.add(key)
+                try:
+                    self._resize(key, session_size(supervisor))
+                except Exception as e:
+                    pass
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            if supervisor is not None and key in self._dirty:
+                with key_lock:
+                    if self._sessions.get(key) is supervisor:
+                        self._save(id, chat_id, supervisor)
+        finally:
+            self._evict()
+
+    def history(self, id: str) -> List[Dict]:
+        """
+        Return the chat_id, pdf_title and url of every chat of a user, in creation order.
+        """
+        return self.store.history(id)
+
+    def persist_all(self) -> None:
+        """
+        Save every session in memory that has unsaved changes to the store.
+        """
+        with self._lock:
+            sessions = [(key, supervisor) for key, supervisor in self._sessions.items() if key in self._dirty]
+        for (id, chat_id), supervisor in sessions:
+            try:
+                self._save(id, chat_id, supervisor)
+            except SessionConflict as e:
+                continue
+
+    def _touch(self, key: Tuple[str, str]) -> Optional[SUPERVISOR_AGENT]:
+        supervisor = self._sessions.get(key)
+        if supervisor is not None:
+            self._sessions.move_to_end(key)
+        return supervisor
+
+    def _resize(self, key: Tuple[str, str], size: int) -> None:
+        self.memory_used += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+            self.memory_used -= self._sizes.pop(key, 0)
+            self._versions.pop(key, None)
+            self._dirty.discard(key)
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                if self.memory_used <= self.memory_budget:
+                    return
+                key = next((key for key in self._sessions if not self._pins.get(key)), None)
+                if key is None:
+                    return
+                supervisor = self._sessions[key]
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+            with key_lock:
+                try:
+                    if key in self._dirty and not self._save(key[0], key[1], supervisor):
+                        # Keep the session rather than losing its changes
+                        return
+                except SessionConflict as e:
+                    # The stored state is newer, and this copy was already dropped
+                    continue
+                with self._lock:
+                    # A request may have pinned the session while it was being saved
+                    if self._pins.get(key) or self._sessions.get(key) is not supervisor:
+                        continue
+                self._drop(key)
+                self.evictions += 1
+
+    def _save(self, id: str, chat_id: str, supervisor: SUPERVISOR_AGENT) -> bool:
+        key = (id, chat_id)
+        try:
+            state = supervisor.export_state()
+            state["doc_hash"] = supervisor.document.doc_hash
+            self.store.put_document(state["doc_hash"], supervisor.pdf_content)
+            version = self.store.save(id, chat_id, state, self._versions.get(key, 0))
+        except Exception as e:
+            return False
+
+        if version is None:
+            # Another worker saved the chat since it was loaded here: its state wins, and
+            # this copy is dropped so the next request reloads it
+            self.conflicts += 1
+            self._drop(key)
+            raise SessionConflict(id, chat_id)
+        with self._lock:
+            self._versions[key] = version
+            self._dirty.discard(key)
+
+        # The memory snapshot is only published once its state is stored, under the
+        # session version it belongs to, so a refused save never replaces it
+        try:
+            supervisor.agent.cache_index.save_index(self.store.cache_index_path(id, chat_id), version=f"{version:020d}")
+        except Exception as e:
+            pass
+        return True
+
+    def _rehydrate(self, id: str, chat_id: str) -> Optional[SUPERVISOR_AGENT]:
+        # None only when the chat has no saved state. A state that can't be loaded is an
+        # error, not a new chat: starting over would hide the history and every later save
+        # would be refused as a conflict
+        try:
+            state = self.store.load(id, chat_id)
+            if state is None:
+                return None
+            pdf_content = self.store.get_document(state["doc_hash"])
+            supervisor = SUPERVISOR_AGENT.from_state(state, chat_llm, TOOL_REGISTRY, TOOL_MAP, pdf_content)
+        except Exception:
+            logger.exception("Could not rehydrate chat %s of %s", chat_id, id)
+            raise
+        self._restore_cache_index(supervisor, id, chat_id)
+        with self._lock:
+            self._versions[(id, chat_id)] = state["version"]
+        self.rehydrations += 1
+        return supervisor
+
+    def _restore_cache_index(self, supervisor: SUPERVISOR_AGENT, id: str, chat_id: str) -> None:
+        path = self.store.cache_index_path(id, chat_id)
+        if os.path.isdir(path):
+            try:
+                supervisor.agent.cache_index = DynamicCacheIndex.from_snapshot(path)
+            except Exception as e:
+                pass
+
+
+session_manager = SessionManager()
@@ -0,0 +1,389 @@
+import fcntl
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from rag_agent.utils import CACHE_DIR, SESSION_LEASE_SECONDS, SESSION_STORE
+
+SESSION_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class InvalidSessionKey(ValueError):
+    """Raised for a user id or chat id that is not made of letters, digits, '_' and '-'."""
+
+
+class SessionConflict(Exception):
+    """Raised when another worker saved a session after it was loaded."""
+
+    def __init__(self, id: str, chat_id: str):
+        super().__init__(f"Chat {chat_id} of {id} was changed by another request, please retry")
+        self.id = id
+        self.chat_id = chat_id
+
+
+def check_session_key(*keys: str) -> None:
+    """
+    Check that user ids and chat ids can be used as path components and keys.
+
+    Raises:
+        InvalidSessionKey: If one of them is not made of letters, digits, '_' and '-'.
+    """
+    for value in keys:
+        if not isinstance(value, str) or not SESSION_KEY_PATTERN.fullmatch(value):
+            raise InvalidSessionKey(f"Invalid session key: {value!r}")
+
+
+class SessionStore(ABC):
+    """
+    Interface of the shared storage of chat sessions.
+
+    A store holds, for every `(id, chat_id)`, the state exported by `SUPERVISOR_AGENT.export_state`
+    with a version number, the chat's history entry, the PDFs by content hash and a
+    directory for the snapshot of the chat's memory cache index. Every worker process
+    reads and writes sessions through the same store, so any of them can serve any chat.
+
+    Writes are optimistic: `save` only succeeds if the stored version is still the one
+    the caller loaded, so a worker never silently overwrites a newer state. Requests of a
+    chat are serialized across workers with `acquire_lock` and `release_lock`.
+
+    User ids and chat ids are checked with `check_session_key` before they are used.
+    """
+
+    @abstractmethod
+    def version(self, id: str, chat_id: str) -> int:
+        """Return the stored version of a session, 0 if it was never saved."""
+
+    @abstractmethod
+    def load(self, id: str, chat_id: str) -> Optional[Dict]:
+        """Return the stored state of a session, with its `version`, or None."""
+
+    @abstractmethod
+    def save(self, id: str, chat_id: str, state: Dict, version: int) -> Optional[int]:
+        """
+        Store the state of a session if its stored version is still `version`.
+
+        Args:
+            id (str): Id of the user.
+            chat_id (str): Id of the chat.
+            state (dict): State exported by the supervisor.
+            version (int): Version the state was loaded at, 0 for a new session.
+
+        Returns:
+            Optional[int]: The new version, or None if another worker saved the session since.
+        """
+
+    @abstractmethod
+    def register(self, id: str, chat_id: str, entry: Dict) -> None:
+        """Add a chat, with its chat_id, pdf_title and url, to the history of a user."""
+
+    @abstractmethod
+    def history(self, id: str) -> List[Dict]:
+        """Return the history entries of a user, in creation order."""
+
+    @abstractmethod
+    def put_document(self, doc_hash: str, pdf_content: bytes) -> None:
+        """Store a PDF by content hash, once."""
+
+    @abstractmethod
+    def get_document(self, doc_hash: str) -> Optional[bytes]:
+        """Return a stored PDF, or None."""
+
+    @abstractmethod
+    def cache_index_path(self, id: str, chat_id: str) -> str:
+        """Return the directory the memory cache index of a chat is snapshotted to."""
+
+    @abstractmethod
+    def acquire_lock(self, id: str, chat_id: str):
+        """
+        Block until this caller holds the lock of a chat, across all worker processes.
+
+        Returns:
+            The token to pass to `release_lock`.
+        """
+
+    @abstractmethod
+    def release_lock(self, id: str, chat_id: str, token) -> None:
+        """
+        Release a lock taken with `acquire_lock`.
+
+        Raises:
+            SessionConflict: If the lock expired while it was held, so another request may
+                             have run the chat meanwhile.
+        """
+
+
+class FileSessionStore(SessionStore):
+    """
+    Session store on a (shared) filesystem.
+
+    Layout:
+        root/<id>/<chat_id>/state.json    state of the session
+        root/<id>/<chat_id>/version       version of state.json
+        root/<id>/<chat_id>/meta.json     history entry
+        root/<id>/<chat_id>/cache_index/  memory cache index snapshot
+        documents_root/<sha256>.pdf       PDFs
+
+    Saves of a session are serialized across processes by an `fcntl` lock on
+    `root/<id>/<chat_id>/.lock`, and requests of a chat by one on `root/<id>/<chat_id>/.request.lock`.
+
+    Args:
+        root (str, optional): Directory of the sessions. Defaults to `<RAG_CACHE_DIR>/sessions`.
+        documents_root (str, optional): Directory of the PDFs. Defaults to `<RAG_CACHE_DIR>/documents`.
+    """
+
+    STATE_FILE = "state.json"
+    VERSION_FILE = "version"
+    META_FILE = "meta.json"
+    LOCK_FILE = ".lock"
+    REQUEST_LOCK_FILE = ".request.lock"
+    CACHE_INDEX_DIR = "cache_index"
+
+    def __init__(self, root: Optional[str] = None, documents_root: Optional[str] = None):
+        self.root = root or os.path.join(CACHE_DIR, "sessions")
+        self.documents_root = documents_root or os.path.join(CACHE_DIR, "documents")
+
+    def _path(self, id: str, chat_id: str) -> str:
+        check_session_key(id, chat_id)
+        return os.path.join(self.root, id, chat_id)
+
+    def _write(self, path: str, data, mode: str = "w") -> None:
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def version(self, id: str, chat_id: str) -> int:
+        try:
+            with open(os.path.join(self._path(id, chat_id), self.VERSION_FILE), "r") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError) as e:
+            return 0
+
+    def load(self, id: str, chat_id: str) -> Optional[Dict]:
+        path = os.path.join(self._path(id, chat_id), self.STATE_FILE)
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError as e:
+            return None
+
+    def save(self, id: str, chat_id: str, state: Dict, version: int) -> Optional[int]:
+        path = self._path(id, chat_id)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, self.LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self.version(id, chat_id) != version:
+                    return None
+                version += 1
+                self._write(os.path.join(path, self.STATE_FILE), json.dumps({**state, "version": version}))
+                self._write(os.path.join(path, self.VERSION_FILE), str(version))
+                return version
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def register(self, id: str, chat_id: str, entry: Dict) -> None:
+        path = self._path(id, chat_id)
+        os.makedirs(path, exist_ok=True)
+        self._write(os.path.join(path, self.META_FILE), json.dumps({**entry, "created_at": time.time()}))
+
+    def history(self, id: str) -> List[Dict]:
+        check_session_key(id)
+        user_path = os.path.join(self.root, id)
+        if not os.path.isdir(user_path):
+            return []
+
+        entries = []
+        for chat_id in os.listdir(user_path):
+            try:
+                with open(os.path.join(user_path, chat_id, self.META_FILE), "r") as f:
+                    entries.append(json.load(f))
+            except Exception as e:
+                continue
+        entries.sort(key=lambda entry: entry.pop("created_at", 0))
+        return entries
+
+    def put_document(self, doc_hash: str, pdf_content: bytes) -> None:
+        path = os.path.join(self.documents_root, f"{doc_hash}.pdf")
+        if not os.path.exists(path):
+            os.makedirs(self.documents_root, exist_ok=True)
+            self._write(path, pdf_content, "wb")
+
+    def get_document(self, doc_hash: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.documents_root, f"{doc_hash}.pdf"), "rb") as f:
+                return f.read()
+        except FileNotFoundError as e:
+            return None
+
+    def cache_index_path(self, id: str, chat_id: str) -> str:
+        return os.path.join(self._path(id, chat_id), self.CACHE_INDEX_DIR)
+
+    def acquire_lock(self, id: str, chat_id: str):
+        path = self._path(id, chat_id)
+        os.makedirs(path, exist_ok=True)
+        lock_file = open(os.path.join(path, self.REQUEST_LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except BaseException:
+            lock_file.close()
+            raise
+        return lock_file
+
+    def release_lock(self, id: str, chat_id: str, token) -> None:
+        try:
+            fcntl.flock(token, fcntl.LOCK_UN)
+        finally:
+            token.close()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a SQLite database.
+
+    States, history entries and PDFs are rows of `path`, opened in WAL mode so readers
+    never block the writer. Versions are checked inside the `UPDATE` of a save. The memory
+    cache index snapshots, which are directories, are kept under `root/<id>/<chat_id>/cache_index`.
+
+    The lock of a chat is a lease row in `leases`, taken by inserting it and released by
+    deleting it. A lease expires after `lease_seconds`, so a crashed worker can't hold a
+    chat forever, and is renewed by a heartbeat thread while it is held, so a long agent run
+    keeps it. Releasing a lease that was lost anyway (e.g. the worker stalled past its
+    expiry) raises `SessionConflict`, since another request may have run the chat meanwhile.
+
+    Args:
+        path (str, optional): Database file. Defaults to `<RAG_CACHE_DIR>/sessions.db`.
+        root (str, optional): Directory of the cache index snapshots. Defaults to `<RAG_CACHE_DIR>/sessions`.
+        lease_seconds (float, optional): Lifetime of a chat lock. Defaults to SESSION_LEASE_SECONDS.
+    """
+
+    LEASE_POLL_SECONDS = 0.05
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sessions (id TEXT, chat_id TEXT, version INTEGER, state TEXT, "
+        "updated_at REAL, PRIMARY KEY (id, chat_id))",
+        "CREATE TABLE IF NOT EXISTS chats (id TEXT, chat_id TEXT, pdf_title TEXT, url TEXT, "
+        "created_at REAL, PRIMARY KEY (id, chat_id))",
+        "CREATE TABLE IF NOT EXISTS documents (doc_hash TEXT PRIMARY KEY, content BLOB)",
+        "CREATE TABLE IF NOT EXISTS leases (id TEXT, chat_id TEXT, owner TEXT, expires_at REAL, "
+        "PRIMARY KEY (id, chat_id))",
+    )
+
+    def __init__(self, path: Optional[str] = None, root: Optional[str] = None,
+                 lease_seconds: float = SESSION_LEASE_SECONDS):
+        self.path = path or os.path.join(CACHE_DIR, "sessions.db")
+        self.root = root or os.path.join(CACHE_DIR, "sessions")
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def version(self, id: str, chat_id: str) -> int:
+        with self._connect() as connection:
+            row = connection.execute("SELECT version FROM sessions WHERE id = ? AND chat_id = ?", (id, chat_id)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, id: str, chat_id: str) -> Optional[Dict]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT version, state FROM sessions WHERE id = ? AND chat_id = ?", (id, chat_id)).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[1]), "version": row[0]}
+
+    def save(self, id: str, chat_id: str, state: Dict, version: int) -> Optional[int]:
+        data = json.dumps(state)
+        with self._connect() as connection:
+            if version == 0:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO sessions VALUES (?, ?, 1, ?, ?)", (id, chat_id, data, time.time()))
+            else:
+                cursor = connection.execute(
+                    "UPDATE sessions SET version = version + 1, state = ?, updated_at = ? "
+                    "WHERE id = ? AND chat_id = ? AND version = ?", (data, time.time(), id, chat_id, version))
+        return version + 1 if cursor.rowcount == 1 else None
+
+    def register(self, id: str, chat_id: str, entry: Dict) -> None:
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO chats VALUES (?, ?, ?, ?, ?)",
+                               (id, chat_id, entry["pdf_title"], entry["url"], time.time()))
+
+    def history(self, id: str) -> List[Dict]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT chat_id, pdf_title, url FROM chats WHERE id = ? ORDER BY created_at", (id,)).fetchall()
+        return [{"chat_id": chat_id, "pdf_title": pdf_title, "url": url} for chat_id, pdf_title, url in rows]
+
+    def put_document(self, doc_hash: str, pdf_content: bytes) -> None:
+        with self._connect() as connection:
+            connection.execute("INSERT OR IGNORE INTO documents VALUES (?, ?)", (doc_hash, sqlite3.Binary(pdf_content)))
+
+    def get_document(self, doc_hash: str) -> Optional[bytes]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT content FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def cache_index_path(self, id: str, chat_id: str) -> str:
+        check_session_key(id, chat_id)
+        return os.path.join(self.root, id, chat_id, "cache_index")
+
+    def acquire_lock(self, id: str, chat_id: str):
+        check_session_key(id, chat_id)
+        owner = uuid.uuid4().hex
+        while True:
+            now = time.time()
+            with self._connect() as connection:
+                connection.execute("DELETE FROM leases WHERE id = ? AND chat_id = ? AND expires_at < ?", (id, chat_id, now))
+                cursor = connection.execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?)",
+                                            (id, chat_id, owner, now + self.lease_seconds))
+            if cursor.rowcount == 1:
+                break
+            time.sleep(self.LEASE_POLL_SECONDS)
+
+        lease = {"owner": owner, "released": threading.Event(), "lost": False}
+        threading.Thread(target=self._heartbeat, args=(id, chat_id, lease),
+                         name=f"lease-{chat_id}", daemon=True).start()
+        return lease
+
+    def _heartbeat(self, id: str, chat_id: str, lease: Dict) -> None:
+        # Push the expiry of a held lease forward a few times per lifetime, until it is released
+        while not lease["released"].wait(self.lease_seconds / 3):
+            try:
+                with self._connect() as connection:
+                    cursor = connection.execute(
+                        "UPDATE leases SET expires_at = ? WHERE id = ? AND chat_id = ? AND owner = ?",
+                        (time.time() + self.lease_seconds, id, chat_id, lease["owner"]))
+            except sqlite3.Error:
+                continue
+            if cursor.rowcount == 0:
+                lease["lost"] = True
+                return
+
+    def release_lock(self, id: str, chat_id: str, token) -> None:
+        token["released"].set()
+        with self._connect() as connection:
+            cursor = connection.execute("DELETE FROM leases WHERE id = ? AND chat_id = ? AND owner = ?",
+                                        (id, chat_id, token["owner"]))
+        if token["lost"] or cursor.rowcount == 0:
+            raise SessionConflict(id, chat_id)
+
+
+def create_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    """
+    Create the session store selected by the SESSION_STORE setting: 'file' or 'sqlite'.
+    """
+    if kind == "file":
+        return FileSessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown session store: {kind}")
@@ -1,82 +1,148 @@
-from dotenv import load_dotenv
-from langchain.prompts import ChatPromptTemplate
-import numpy as np
-from rag_agent.utils  import client_table
-import os 
-
-    
-def generate_agent_description(name, tool_desc, prompt):
-    """
-    Generate a function description as a string.
-
-    Args:
-        name (str): The name of the function.
-        tool_desc (str): A description of what the function/tool does.
-        prompt (str or ChatPromptTemplate): The prompt used by the function.
-
-    Returns:
-        str: A formatted function definition as a string.
-    """
-    # Ensure the prompt is properly formatted as a string
-    if isinstance(prompt, ChatPromptTemplate):
-        prompt_str = repr(prompt)  # Serialize ChatPromptTemplate as a string
-    else:
-        prompt_str = repr(prompt)
-    str1 = f"""
-def {name}(query):
-    '''
-    Name: {name}
-    Description: {tool_desc}
-    Args:
-        query (str): The query to be passed to the agent .
-                     Example: "Args"
-
-    Returns:
-        str: A string response
-    '''
-    annotation = chat_llm.invoke({prompt_str}.format(query=query)).content
-    pattern = r'```python\\n(.*?)\\n```'
-    matches = re.findall(pattern, annotation, re.DOTALL)
-    parsed_response = matches[-1] if matches else None
-    old_stdout = sys.stdout
-    sys.stdout = StringIO()
-    try:
-        if parsed_response:
-            exec(parsed_response)
-            annot = sys.stdout.getvalue()
-        else:
-            annot = "No valid Python code found in the response."
-    except Exception as e:
-        annot = traceback.format_exc()
-    finally:
-        sys.stdout = old_stdout
-    return str(annot)
-"""
-    return str1
-
-def generate_pdf_name(first_two_page_content):
-    prompt_text = f"""You are an assistant tasked with generating title for give pdf content. \
-    You are provided with the content of first two pages of the pdf content \
-    You have to return short , concise title that is relevant to the pdf
-    Title should not be long that 3-4 words
-    Return only title 
-    Pdf Content:{first_two_page_content} 
-    Title:"""
-
-    title = client_table.chat.completions.create(
-        model="llama-3.1-70b-versatile",  # Specify the model you want to use
-        messages=[
-            {
-                "role": "user",
-                "content": prompt_text
-            }
-        ],
-        temperature=0.7,         # Control randomness
-        top_p=0.9,               # Sampling control for nucleus sampling
-        stream=False             # Change to True if you want streaming responses
-    )
-    return title.choices[0].message.content
-
-class AgentCode:
-    def __init__(self, content):
-        self.content = content
\ No newline at end of file
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+import numpy as np
+from rag_agent.utils  import client_table, parse_literal, llm_cache
+import os 
+
+    
+def generate_agent_description(name, tool_desc, prompt):
+    """
+    Generate a function description as a string.
+
+    Args:
+        name (str): The name of the function.
+        tool_desc (str): A description of what the function/tool does.
+        prompt (str or ChatPromptTemplate): The prompt used by the function.
+
+    Returns:
+        str: A formatted function definition as a string.
+    """
+    # Ensure the prompt is properly formatted as a string
+    if isinstance(prompt, ChatPromptTemplate):
+        prompt_str = repr(prompt)  # Serialize ChatPromptTemplate as a string
+    else:
+        prompt_str = repr(prompt)
+    str1 = f"""
+def {name}(query):
+    '''
+    Name: {name}
+    Description: {tool_desc}
+    Args:
+        query (str): The query to be passed to the agent .
+                     Example: "Args"
+
+    Returns:
+        str: A string response
+    '''
+    annotation = chat_llm.invoke({prompt_str}.format(query=query)).content
+    pattern = r'```python\\n(.*?)\\n```'
+    matches = re.findall(pattern, annotation, re.DOTALL)
+    parsed_response = matches[-1] if matches else None
+    old_stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        if parsed_response:
+            exec(parsed_response)
+            annot = sys.stdout.getvalue()
+        else:
+            annot = "No valid Python code found in the response."
+    except Exception as e:
+        annot = traceback.format_exc()
+    finally:
+        sys.stdout = old_stdout
+    return str(annot)
+"""
+    return str1
+
+def generate_pdf_name(first_two_page_content):
+    prompt_text = f"""You are an assistant tasked with generating title for give pdf content. \
+    You are provided with the content of first two pages of the pdf content \
+    You have to return short , concise title that is relevant to the pdf
+    Title should not be long that 3-4 words
+    Return only title 
+    Pdf Content:{first_two_page_content} 
+    Title:"""
+
+    def request_title():
+        title = client_table.chat.completions.create(
+            model="llama-3.1-70b-versatile",  # Specify the model you want to use
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt_text
+                }
+            ],
+            temperature=0.7,         # Control randomness
+            top_p=0.9,               # Sampling control for nucleus sampling
+            stream=False             # Change to True if you want streaming responses
+        )
+        return title.choices[0].message.content
+
+    return llm_cache.cached("pdf_name", "llama-3.1-70b-versatile", {"temperature": 0.7, "top_p": 0.9}, prompt_text, request_title)
+
+class ToolCall:
+    """
+    Tool call of the code agent, parsed from its ["tool_name", [arguments], "Reasoning"] output.
+
+    Attributes:
+        name (str): Name of the tool, or "NONE" / "end_tool".
+        args: Arguments of the tool, usually a list of positional arguments.
+        reason (str): Reasoning given for the call.
+    """
+
+    NO_REASON = "Reason is not Provided"
+
+    def __init__(self, name, args=None, reason=NO_REASON):
+        self.name = name
+        self.args = args if args is not None else []
+        self.reason = reason
+
+    @property
+    def is_end(self):
+        return self.name.lower() == "end_tool"
+
+    @property
+    def is_none(self):
+        return self.name.lower() == "none"
+
+    @classmethod
+    def parse(cls, content):
+        """
+        Parse the output of the code agent with `parse_literal`.
+
+        Returns:
+            Optional[ToolCall]: The tool call, or None if the output is not a tool call.
+        """
+        if content is None:
+            return None
+        if content.strip().lower() in ("none", "end_tool"):
+            return cls(content.strip())
+        try:
+            value = parse_literal(content)
+        except ValueError:
+            return None
+        if not isinstance(value, (list, tuple)) or not value or not isinstance(value[0], str):
+            return None
+        return cls(value[0], value[1] if len(value) > 1 else None, value[2] if len(value) > 2 else cls.NO_REASON)
+
+
+class AgentCode:
+    """
+    Output of the code agent. Its tool call is parsed once, on first access, and again
+    only if `content` is replaced.
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self._tool_call = None
+        self._parsed_content = None
+
+    def __str__(self):
+        return str(self.content)
+
+    @property
+    def tool_call(self):
+        if self._parsed_content is not self.content:
+            self._tool_call = ToolCall.parse(self.content)
+            self._parsed_content = self.content
+        return self._tool_call
\ No newline at end of file
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from rag_agent.utils import CACHE_DIR, TABLE_SUMMARY_WORKERS, client_table, table_summary_limiter
+
+
+def table_summary(html_code):
+    """
+    Generate a concise summary of a table from its HTML representation.
+
+    This function uses a large language model to create a retrieval-optimized
+    summary of a table, preserving all critical information including numerical data.
+
+    Args:
+        html_code (str): The HTML code representing the table to be summarized.
+
+    Returns:
+        str: A concise, information-rich summary of the table content.
+
+    Example:
+        >>> html_table = "<table>...</table>"
+        >>> summary = table_summary(html_table)
+        >>> print(summary)
+        'Table summary with key insights...'
+    """
+
+    prompt_text = f"""You are an assistant tasked with summarizing tables for retrieval. \
+    These summaries will be embedded and used to retrieve the raw table elements. \
+    You will be given with html code of table, you have to return concise summary of table (without lossing any information , including numerical), well optimized for retrieval. Table:{html_code} Summary:"""
+
+    summary = client_table.chat.completions.create(
+        model="llama-3.1-70b-versatile",
+        messages=[{"role": "user", "content": prompt_text}],
+        temperature=0.7,
+        top_p=0.9,
+        stream=False
+    )
+    return summary.choices[0].message.content
+
+
+class TableSummarizer:
+    """
+    Concurrent, rate limited and cached table summarization stage.
+
+    Summaries are keyed by the sha256 of the table's `text_as_html`, held in memory and
+    written to `root/<hash>.txt`, so a table repeated across pages or filings is
+    summarized once. Uncached tables are summarized on a bounded thread pool, every
+    request first taking a token from `limiter`, and concurrent callers asking for the
+    same table share one in-flight request.
+
+    Args:
+        root (str, optional): Directory of the on-disk cache. Defaults to `<RAG_CACHE_DIR>/table_summaries`.
+        limiter (TokenBucket, optional): Rate limiter of the summary requests. Defaults to `table_summary_limiter`.
+        max_workers (int, optional): Maximum number of in-flight requests. Defaults to TABLE_SUMMARY_WORKERS.
+        max_retries (int, optional): Attempts per table before falling back to the raw HTML. Defaults to 3.
+    """
+
+    def __init__(self, root: Optional[str] = None, limiter=None,
+                 max_workers: int = TABLE_SUMMARY_WORKERS, max_retries: int = 3):
+        self.root = root or os.path.join(CACHE_DIR, "table_summaries")
+        self.limiter = limiter or table_summary_limiter
+        self.max_retries = max_retries
+        self.request_count = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="table-summary")
+        self._summaries: Dict[str, str] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def table_hash(html_code: str) -> str:
+        return hashlib.sha256(str(html_code).encode("utf-8")).hexdigest()
+
+    def summarize(self, html_code: str) -> str:
+        """Summarize a single table."""
+        return self.summarize_many([html_code])[0]
+
+    def summarize_many(self, html_codes: List[str]) -> List[str]:
+        """
+        Summarize several tables concurrently.
+
+        Args:
+            html_codes (List[str]): HTML of every table.
+
+        Returns:
+            List[str]: The summary of every table, in input order. A table whose requests all
+                       failed is returned as its raw HTML and is not cached.
+        """
+        futures = {}
+        for html_code in html_codes:
+            key = self.table_hash(html_code)
+            if key not in futures:
+                futures[key] = self._submit(key, html_code)
+
+        summaries = {}
+        for key, future in futures.items():
+            try:
+                summaries[key] = future.result()
+            except Exception as e:
+                summaries[key] = None
+        return [summaries[self.table_hash(html_code)] or html_code for html_code in html_codes]
+
+    def _submit(self, key: str, html_code: str) -> Future:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+
+            summary = self._cached(key)
+            if summary is not None:
+                future = Future()
+                future.set_result(summary)
+                return future
+
+            future = self._executor.submit(self._summarize, key, html_code)
+            self._in_flight[key] = future
+            return future
+
+    def _summarize(self, key: str, html_code: str) -> Optional[str]:
+        try:
+            for attempt in range(self.max_retries):
+                self.limiter.acquire()
+                try:
+                    summary = table_summary(html_code)
+                    self.request_count += 1
+                except Exception as e:
+                    time.sleep(2 ** attempt)
+                    continue
+                self._store(key, summary)
+                return summary
+            return None
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.txt")
+
+    def _cached(self, key: str) -> Optional[str]:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            return summary
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = f.read()
+        except Exception as e:
+            return None
+        self._summaries[key] = summary
+        return summary
+
+    def _store(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._summaries[key] = summary
+
+        path = self._path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(summary)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+table_summarizer = TableSummarizer()
@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class ToolRegistry:
+    """
+    Ordered index of the tools offered to the code agent, by name.
+
+    Replaces the parallel `tools` (descriptions) and `tools_aux` (names) lists: looking
+    up, adding and removing a tool are O(1), and the `[{description: name}]` listing
+    given to the code agent prompt is built once per change instead of once per step.
+
+    Registries are layered copy-on-write: `overlay()` returns an O(1) child that reads
+    through to its parent, keeps its own additions and masks the parent's tools it
+    removes, without ever copying or changing the parent. The default tools form a frozen
+    base registry, every chat overlays it with the tools its user added, and every run
+    overlays the chat's registry with the tools removed during that run.
+
+    Args:
+        names (Iterable[str], optional): Names of the tools.
+        descriptions (Iterable[str], optional): Descriptions of the tools, in the same order.
+        parent (ToolRegistry, optional): Registry this one is layered on.
+    """
+
+    def __init__(self, names: Iterable[str] = (), descriptions: Iterable[str] = (),
+                 parent: Optional["ToolRegistry"] = None):
+        self._parent = parent
+        self._tools: Dict[str, str] = dict(zip(names, descriptions))
+        self._removed = set()
+        self._frozen = False
+        self._version = 0
+        self._listing = None
+        self._listing_version = None
+
+    def __contains__(self, name: str) -> bool:
+        if name in self._tools:
+            return True
+        return self._parent is not None and name not in self._removed and name in self._parent
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    @property
+    def version(self) -> tuple:
+        """Changes whenever this registry or one of its parents changes."""
+        if self._parent is None:
+            return (self._version,)
+        return (self._version,) + self._parent.version
+
+    def description(self, name: str) -> str:
+        """Return the description of a tool. Raises KeyError for an unknown tool."""
+        if name in self._tools:
+            return self._tools[name]
+        if self._parent is None or name in self._removed:
+            raise KeyError(name)
+        return self._parent.description(name)
+
+    def add(self, name: str, description: str) -> None:
+        self._check_frozen()
+        self._tools[name] = description
+        self._removed.discard(name)
+        self._version += 1
+
+    def remove(self, name: str) -> None:
+        self._check_frozen()
+        self._tools.pop(name, None)
+        if self._parent is not None and name in self._parent:
+            self._removed.add(name)
+        self._version += 1
+
+    def names(self) -> List[str]:
+        if self._parent is None:
+            return list(self._tools)
+        inherited = [name for name in self._parent.names() if name not in self._removed and name not in self._tools]
+        return inherited + list(self._tools)
+
+    def descriptions(self) -> List[str]:
+        return [self.description(name) for name in self.names()]
+
+    def listing(self) -> List[Dict[str, str]]:
+        """Return the `[{description: name}]` listing of the tools used by the agent prompts."""
+        version = self.version
+        if self._listing_version != version:
+            self._listing = [{self.description(name): name} for name in self.names()]
+            self._listing_version = version
+        return self._listing
+
+    def overlay(self) -> "ToolRegistry":
+        """Return an empty copy-on-write layer over this registry."""
+        return ToolRegistry(parent=self)
+
+    def freeze(self) -> "ToolRegistry":
+        """Make the registry read-only and return it."""
+        self._frozen = True
+        return self
+
+    def _check_frozen(self) -> None:
+        if self._frozen:
+            raise TypeError("The registry is frozen; add or remove tools on an overlay() instead.")
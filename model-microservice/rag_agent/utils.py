@@ -1,155 +1,452 @@
-from dotenv import load_dotenv
-import os
-from langchain.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from llama_index.llms.groq import Groq as groq_llama
-from llama_index.embeddings.jinaai import JinaEmbedding
-from groq import Groq as GroqClient
-import unstructured_client
-from typing import Optional
-from rag_agent.prompt import *
-
-load_dotenv()
-
-supervisor_groq_api = os.getenv("SUPERVISOR_GROQ_API_KEY")
-rag_agent_api = os.getenv('RAG_GROQ_API_KEY')
-raptor_api = os.getenv('RAPTOR_GROQ_API_KEY')
-client_api_key = os.getenv('CLIENT_GROQ_API_KEY')
-together_api_key = os.getenv("TOGETHER_API_KEY")
-unstructured_api_key = os.getenv("UNSTRUCTURED_API_KEY")
-unstructured_api_url = os.getenv("UNSTRUCTURED_API_URL")
-jina_api_key = os.getenv("JINAAI_API_KEY")
-embed_jina_api_key = os.getenv('EMBED_JINA_API_KEY')
-
-chat_llm = ChatGroq(model="llama-3.1-70b-versatile", api_key = supervisor_groq_api, temperature=0.1,)
-chat_llm1 = ChatGroq(model="llama3-70b-8192", api_key = rag_agent_api)
-llm = groq_llama(model="llama3-70b-8192", api_key = raptor_api)
-client_table = GroqClient(api_key=client_api_key)
-
-client_unstructured = unstructured_client.UnstructuredClient(
-    api_key_auth=unstructured_api_key, server_url=unstructured_api_url,
-)
-
-text_embed_model = JinaEmbedding(
-    api_key=embed_jina_api_key,
-    model="jina-embeddings-v3",
-    task="retrieval.passage",
-)
-query_embed_model = JinaEmbedding(
-    api_key=embed_jina_api_key,
-    model="jina-embeddings-v3",
-    task="retrieval.query",
-    dimensions=1024,
-)
-
-thought_agent_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful Thought Generating Agent."),
-    ("human", THOUGHT_PROMPT),
-])
-
-reasoning_agent_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful Reasoning Agent."),
-    ("human", REASONING_PROMPT),
-])
-
-jargon_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a jargon detecting agent."),
-    ("human", JARGON_IDENTIFY_PROMPT)
-])
-
-rephrase_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a query rephraser agent."),
-    ("human",  REPHRASE_PROMPT)
-])
-
-code_agent_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a function calling agent."),
-    ("human", CODE_AGENT_PROMPT),
-])
-
-code_reflexion_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a function call reflexion agent."),
-    ("human", CODE_REFLEXION_PROMPT),
-])
-
-failure_detection_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a callback failure agent."),
-    ("human", FAILURE_DETECTION_PROMPT),
-])
-
-final_response_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a final response generator."),
-    ("human", FINAL_RESPONSE_PROMPT),
-])
-
-confidence_score_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are an excellent confidence score based critic agent."),
-    ("human", CONFIDENCE_SCORE_PROMPT)
-])
-
-challenging_cases = ChatPromptTemplate.from_messages([
-    ("system", "You are a challenging and edge cases generation agent"),
-    ("human", EDGE_CASE_GEN),
-])
-
-ranker_instr = ChatPromptTemplate.from_messages([
-    ("system", "You are a ranker agent"),
-    ("human", RANKING_PROMPT),
-])
-
-error_analyser = ChatPromptTemplate.from_messages([
-    ("system", "You are a error analysis agent"),
-    ("human", ERROR_ANALYSIS),
-])
-
-final_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a final prompt agent"),
-    ("human", PROMPT_REFLEXTION),
-])
-
-critic_agent_prompt_1 = ChatPromptTemplate.from_messages([
-    ("system", "You are a response critic agent."),
-    ("human", CRITIC_AGENT_PROMPT_1),
-])
-critic_agent_prompt_2 = ChatPromptTemplate.from_messages([
-    ("system", "You are a response critic agent."),
-    ("human", CRITIC_AGENT_PROMPT_2),
-])
-
-silent_error_reflexion = ChatPromptTemplate.from_messages([
-    ("system", "You are a silent error reflexion agent."),
-    ("human", SILENT_ERROR_REFLEXION),
-])
-
-class SilentError(Exception):
-  """ Error used to define silent errors in API calls. """
-  pass
-
-def llm_response_if_memory_hit_found(query: str, chunk: str) -> Optional[str]:
-    prompt = f"""You are an expert reasoning agent tasked with answering the query from the given chunk of data.
-Follow these guidelines:
-1. Directly answer the query using ONLY the information in the provided chunk
-2. If the chunk does not contain sufficient information, respond with "INSUFFICIENT_CONTEXT"
-3. Be concise and precise in your response
-
-Example:
-Query: What is the capital of France?
-Chunk: France is a country in Western Europe. Its capital is Paris, known for the Eiffel Tower and rich cultural heritage.
-Answer: The capital of France is Paris
-
-Current Query: {query}
-Chunk: {chunk}
-Answer:"""
-
-    try:
-        response = chat_llm.invoke(prompt)
-
-        cleaned_response = response.content.strip()
-
-        if cleaned_response in ["INSUFFICIENT_CONTEXT"]:
-            return None
-
-        return cleaned_response
-
-    except Exception as e:
-        return None
\ No newline at end of file
+from dotenv import load_dotenv
+import os
+import ast
+import json
+import re
+from langchain.prompts import ChatPromptTemplate
+from langchain_groq import ChatGroq
+from llama_index.llms.groq import Groq as groq_llama
+from llama_index.embeddings.jinaai import JinaEmbedding
+from groq import Groq as GroqClient
+import unstructured_client
+from typing import Optional, List
+from concurrent.futures import Future
+import asyncio
+import queue
+import threading
+import time
+import numpy as np
+from rag_agent.prompt import *
+from rag_agent.embedding_cache import EmbeddingCache
+from rag_agent.llm_cache import LLMCache, MemoryLLMCacheBackend, SQLiteLLMCacheBackend
+
+load_dotenv()
+
+supervisor_groq_api = os.getenv("SUPERVISOR_GROQ_API_KEY")
+rag_agent_api = os.getenv('RAG_GROQ_API_KEY')
+raptor_api = os.getenv('RAPTOR_GROQ_API_KEY')
+client_api_key = os.getenv('CLIENT_GROQ_API_KEY')
+together_api_key = os.getenv("TOGETHER_API_KEY")
+unstructured_api_key = os.getenv("UNSTRUCTURED_API_KEY")
+unstructured_api_url = os.getenv("UNSTRUCTURED_API_URL")
+jina_api_key = os.getenv("JINAAI_API_KEY")
+embed_jina_api_key = os.getenv('EMBED_JINA_API_KEY')
+CACHE_DIR = os.getenv("RAG_CACHE_DIR", ".rag_cache")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_COALESCE_WINDOW = float(os.getenv("EMBED_COALESCE_WINDOW", 0.01))
+EMBED_CACHE_BYTES = int(os.getenv("EMBED_CACHE_BYTES", 256 * 1024 * 1024))
+EMBED_CACHE_DISK_BYTES = int(os.getenv("EMBED_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+CACHE_INDEX_DTYPE = os.getenv("CACHE_INDEX_DTYPE", "float32")
+TABLE_SUMMARY_RPM = float(os.getenv("TABLE_SUMMARY_RPM", 30))
+TABLE_SUMMARY_BURST = int(os.getenv("TABLE_SUMMARY_BURST", 4))
+TABLE_SUMMARY_WORKERS = int(os.getenv("TABLE_SUMMARY_WORKERS", 4))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+INGEST_JOB_CACHE_SIZE = int(os.getenv("INGEST_JOB_CACHE_SIZE", 32))
+SESSION_STORE = os.getenv("SESSION_STORE", "file")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+SESSION_MEMORY_BYTES = int(os.getenv("SESSION_MEMORY_BYTES", 512 * 1024 * 1024))
+SESSION_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", 600))
+SPECULATIVE_TOOL_CALLS = os.getenv("SPECULATIVE_TOOL_CALLS", "true").lower() == "true"
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", 4))
+PAGE_SEARCH = os.getenv("PAGE_SEARCH", "hybrid")
+PAGE_INDEX_CACHE_SIZE = int(os.getenv("PAGE_INDEX_CACHE_SIZE", 64))
+RAPTOR_TREE_CACHE_SIZE = int(os.getenv("RAPTOR_TREE_CACHE_SIZE", 16))
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "auto")
+VECTOR_INDEX_HNSW_MIN = int(os.getenv("VECTOR_INDEX_HNSW_MIN", 5000))
+VECTOR_INDEX_IVFPQ_MIN = int(os.getenv("VECTOR_INDEX_IVFPQ_MIN", 200000))
+LLM_CACHE = os.getenv("LLM_CACHE", "sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+
+chat_llm = ChatGroq(model="llama-3.1-70b-versatile", api_key = supervisor_groq_api, temperature=0.1,)
+chat_llm1 = ChatGroq(model="llama3-70b-8192", api_key = rag_agent_api)
+llm = groq_llama(model="llama3-70b-8192", api_key = raptor_api)
+client_table = GroqClient(api_key=client_api_key)
+
+client_unstructured = unstructured_client.UnstructuredClient(
+    api_key_auth=unstructured_api_key, server_url=unstructured_api_url,
+)
+
+text_embed_model = JinaEmbedding(
+    api_key=embed_jina_api_key,
+    model="jina-embeddings-v3",
+    task="retrieval.passage",
+    embed_batch_size=EMBED_BATCH_SIZE,
+)
+query_embed_model = JinaEmbedding(
+    api_key=embed_jina_api_key,
+    model="jina-embeddings-v3",
+    task="retrieval.query",
+    dimensions=1024,
+    embed_batch_size=EMBED_BATCH_SIZE,
+)
+cache_embed_model = JinaEmbedding(
+    api_key=jina_api_key,
+    model="jina-embeddings-v3",
+    embed_batch_size=EMBED_BATCH_SIZE,
+)
+
+class EmbeddingService:
+    """
+    Thread-safe batching front end shared by every caller of an embedding model.
+
+    Texts are sent to the model as multi-input requests of up to `max_batch_size`
+    texts. Calls arriving from different threads within `coalesce_window` seconds of
+    each other are merged into the same request, and identical texts inside a request
+    are embedded only once.
+
+    The Jina task (passage or query) is a property of the wrapped model, so the
+    batch endpoint is used for query models as well.
+
+    When a `cache` is given, texts already embedded under the same `namespace`
+    are served from it and only the misses are sent to the model.
+
+    Args:
+        embed_model (BaseEmbedding): The llama-index embedding model to wrap.
+        cache (EmbeddingCache, optional): Cache of previously computed vectors. Defaults to None.
+        namespace (Tuple, optional): (model, task, dimensions) of `embed_model`, used in the cache key.
+        max_batch_size (int, optional): Maximum number of texts per request. Defaults to EMBED_BATCH_SIZE.
+        coalesce_window (float, optional): Seconds to wait for concurrent calls to join a request.
+                                           Defaults to EMBED_COALESCE_WINDOW.
+
+    Attributes:
+        request_count (int): Number of requests sent to the embedding model.
+        text_count (int): Number of texts sent to the embedding model.
+    """
+
+    def __init__(self, embed_model, cache: Optional[EmbeddingCache] = None, namespace: Optional[tuple] = None,
+                 max_batch_size: int = EMBED_BATCH_SIZE, coalesce_window: float = EMBED_COALESCE_WINDOW):
+        self.embed_model = embed_model
+        self.cache = cache if namespace is not None else None
+        self.namespace = namespace
+        self.max_batch_size = max_batch_size
+        self.coalesce_window = coalesce_window
+        self.request_count = 0
+        self.text_count = 0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queue texts for embedding without blocking.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            Future: Resolves to a float32 matrix with one row per text.
+        """
+        texts = [str(text) for text in texts]
+        if self.cache is None:
+            return self._submit(texts)
+
+        cached = self.cache.get_many(self.namespace, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        future = Future()
+        if not missing:
+            future.set_result(np.stack(cached) if texts else np.zeros((0, 0), dtype="float32"))
+            return future
+
+        def _merge(inner):
+            try:
+                fetched = dict(zip(missing, inner.result()))
+            except Exception as e:
+                future.set_exception(e)
+                return
+            for text, vector in fetched.items():
+                self.cache.put(self.namespace, text, vector)
+            future.set_result(np.stack([
+                fetched[text] if vector is None else vector for text, vector in zip(texts, cached)
+            ]))
+
+        self._submit(missing).add_done_callback(_merge)
+        return future
+
+    def _submit(self, texts: List[str]) -> Future:
+        future = Future()
+        if not texts:
+            future.set_result(np.zeros((0, 0), dtype="float32"))
+            return future
+
+        self._ensure_worker()
+        self._queue.put((texts, future))
+        return future
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: float32 matrix with one row per text.
+        """
+        return self.submit(texts).result()
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Embed a single text and return its float32 vector."""
+        return self.embed([text])[0]
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        """Async variant of `embed`."""
+        return await asyncio.wrap_future(self.submit(texts))
+
+    async def aembed_one(self, text: str) -> np.ndarray:
+        """Async variant of `embed_one`."""
+        return (await self.aembed([text]))[0]
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.coalesce_window
+
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            self._flush(pending)
+
+    def _flush(self, pending) -> None:
+        unique_texts = list(dict.fromkeys(text for texts, _ in pending for text in texts))
+        try:
+            vectors = {}
+            for i in range(0, len(unique_texts), self.max_batch_size):
+                batch = unique_texts[i:i + self.max_batch_size]
+                embeddings = self.embed_model.get_text_embedding_batch(batch)
+                self.request_count += 1
+                self.text_count += len(batch)
+                for text, embedding in zip(batch, embeddings):
+                    vectors[text] = np.asarray(embedding, dtype="float32")
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        for texts, future in pending:
+            future.set_result(np.stack([vectors[text] for text in texts]))
+
+_embedding_services = {}
+_embedding_services_lock = threading.Lock()
+
+def embedding_service(embed_model, namespace: Optional[tuple] = None) -> EmbeddingService:
+    """
+    Return the process-wide `EmbeddingService` of an embedding model, creating it on first use.
+
+    Every caller of the same model shares one service, so their requests are coalesced.
+    Models registered with a `namespace` are also backed by the shared `embedding_cache`.
+    """
+    with _embedding_services_lock:
+        service = _embedding_services.get(id(embed_model))
+        if service is None:
+            service = EmbeddingService(embed_model, cache=embedding_cache, namespace=namespace)
+            _embedding_services[id(embed_model)] = service
+        return service
+
+embedding_cache = EmbeddingCache(os.path.join(CACHE_DIR, "embeddings"), max_bytes=EMBED_CACHE_BYTES,
+                                 max_disk_bytes=EMBED_CACHE_DISK_BYTES)
+text_embedder = embedding_service(text_embed_model, ("jina-embeddings-v3", "retrieval.passage", None))
+query_embedder = embedding_service(query_embed_model, ("jina-embeddings-v3", "retrieval.query", 1024))
+cache_embedder = embedding_service(cache_embed_model, ("jina-embeddings-v3", None, None))
+
+# LLM_CACHE is "sqlite" (persistent), "memory" or "off"
+llm_cache = LLMCache(
+    SQLiteLLMCacheBackend(os.path.join(CACHE_DIR, "llm_cache.db")) if LLM_CACHE == "sqlite" else MemoryLLMCacheBackend(),
+    ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES, enabled=LLM_CACHE != "off")
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second up to `capacity`, so short
+    bursts go through immediately while the long run average stays under `rate`.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum number of tokens held, i.e. the burst size.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until `tokens` tokens are available and take them.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+table_summary_limiter = TokenBucket(TABLE_SUMMARY_RPM / 60.0, TABLE_SUMMARY_BURST)
+
+thought_agent_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful Thought Generating Agent."),
+    ("human", THOUGHT_PROMPT),
+])
+
+reasoning_agent_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful Reasoning Agent."),
+    ("human", REASONING_PROMPT),
+])
+
+jargon_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a jargon detecting agent."),
+    ("human", JARGON_IDENTIFY_PROMPT)
+])
+
+rephrase_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a query rephraser agent."),
+    ("human",  REPHRASE_PROMPT)
+])
+
+code_agent_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a function calling agent."),
+    ("human", CODE_AGENT_PROMPT),
+])
+
+code_reflexion_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a function call reflexion agent."),
+    ("human", CODE_REFLEXION_PROMPT),
+])
+
+failure_detection_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a callback failure agent."),
+    ("human", FAILURE_DETECTION_PROMPT),
+])
+
+final_response_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a final response generator."),
+    ("human", FINAL_RESPONSE_PROMPT),
+])
+
+confidence_score_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are an excellent confidence score based critic agent."),
+    ("human", CONFIDENCE_SCORE_PROMPT)
+])
+
+challenging_cases = ChatPromptTemplate.from_messages([
+    ("system", "You are a challenging and edge cases generation agent"),
+    ("human", EDGE_CASE_GEN),
+])
+
+ranker_instr = ChatPromptTemplate.from_messages([
+    ("system", "You are a ranker agent"),
+    ("human", RANKING_PROMPT),
+])
+
+error_analyser = ChatPromptTemplate.from_messages([
+    ("system", "You are a error analysis agent"),
+    ("human", ERROR_ANALYSIS),
+])
+
+final_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a final prompt agent"),
+    ("human", PROMPT_REFLEXTION),
+])
+
+critic_agent_prompt_1 = ChatPromptTemplate.from_messages([
+    ("system", "You are a response critic agent."),
+    ("human", CRITIC_AGENT_PROMPT_1),
+])
+critic_agent_prompt_2 = ChatPromptTemplate.from_messages([
+    ("system", "You are a response critic agent."),
+    ("human", CRITIC_AGENT_PROMPT_2),
+])
+
+silent_error_reflexion = ChatPromptTemplate.from_messages([
+    ("system", "You are a silent error reflexion agent."),
+    ("human", SILENT_ERROR_REFLEXION),
+])
+
+class SilentError(Exception):
+  """ Error used to define silent errors in API calls. """
+  pass
+
+def llm_response_if_memory_hit_found(query: str, chunk: str) -> Optional[str]:
+    prompt = f"""You are an expert reasoning agent tasked with answering the query from the given chunk of data.
+Follow these guidelines:
+1. Directly answer the query using ONLY the information in the provided chunk
+2. If the chunk does not contain sufficient information, respond with "INSUFFICIENT_CONTEXT"
+3. Be concise and precise in your response
+
+Example:
+Query: What is the capital of France?
+Chunk: France is a country in Western Europe. Its capital is Paris, known for the Eiffel Tower and rich cultural heritage.
+Answer: The capital of France is Paris
+
+Current Query: {query}
+Chunk: {chunk}
+Answer:"""
+
+    try:
+        response = llm_cache.invoke("memory_hit_answer", chat_llm, prompt)
+
+        cleaned_response = response.content.strip()
+
+        if cleaned_response in ["INSUFFICIENT_CONTEXT"]:
+            return None
+
+        return cleaned_response
+
+    except Exception as e:
+        return None
+
+def parse_literal(text: str):
+    """
+    Parse a Python or JSON literal returned by an LLM, such as a tool call list or a critic
+    verdict dict, without evaluating it as code.
+
+    Args:
+        text (str): The LLM output, optionally wrapped in a markdown code fence.
+
+    Returns:
+        The parsed value.
+
+    Raises:
+        ValueError: If the text is not a literal.
+    """
+    text = str(text).strip()
+    fenced = re.match(r"^```\w*\s*(.*?)\s*```$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (SyntaxError, ValueError) as e:
+        raise ValueError(f"Not a literal: {text!r}") from e
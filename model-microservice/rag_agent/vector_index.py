@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from rag_agent.utils import VECTOR_INDEX, VECTOR_INDEX_HNSW_MIN, VECTOR_INDEX_IVFPQ_MIN
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+PQ_BITS = 8
+RECALL_K = 10
+RECALL_SAMPLE = 100
+
+# Build time and recall of the latest indices built, newest last
+index_reports = deque(maxlen=100)
+_reports_lock = threading.Lock()
+
+
+def choose_index_kind(size: int, kind: str = VECTOR_INDEX) -> str:
+    """
+    Resolve the kind of index to build for a number of vectors.
+
+    Args:
+        size (int): Number of vectors to index.
+        kind (str, optional): "auto", "flat", "hnsw", "ivfpq" or "l2". Defaults to VECTOR_INDEX.
+
+    Returns:
+        str: "flat" (exact inner product) below VECTOR_INDEX_HNSW_MIN vectors, "hnsw" below
+             VECTOR_INDEX_IVFPQ_MIN and "ivfpq" above when `kind` is "auto", `kind` otherwise.
+             IVF-PQ falls back to HNSW when there are too few vectors to train it.
+    """
+    if kind == "auto":
+        if size < VECTOR_INDEX_HNSW_MIN:
+            return "flat"
+        kind = "hnsw" if size < VECTOR_INDEX_IVFPQ_MIN else "ivfpq"
+    if kind == "ivfpq" and size < max(39 * ivf_lists(size), 2 ** PQ_BITS):
+        return "hnsw"
+    return kind
+
+
+def ivf_lists(size: int) -> int:
+    """Number of IVF lists for a corpus: about 4 * sqrt(size)."""
+    return max(1, int(4 * math.sqrt(size)))
+
+
+def pq_subquantizers(dim: int) -> int:
+    """Number of PQ subquantizers: 16 dimensions per byte code, and a divisor of `dim`."""
+    for m in (dim // 16, 64, 32, 16, 8, 4, 2, 1):
+        if m >= 1 and dim % m == 0:
+            return m
+    return 1
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    """Return an L2-normalized float32 copy of a matrix of vectors."""
+    vectors = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def new_vector_index(dim: int, size: int, kind: str = VECTOR_INDEX):
+    """
+    Create an empty FAISS index for `size` vectors of dimension `dim`.
+
+    Every kind but "l2" is a cosine index: an inner product index meant for
+    L2-normalized vectors. IVF-PQ indices have to be trained before vectors are added.
+
+    Args:
+        dim (int): Dimension of the vectors.
+        size (int): Expected number of vectors, used to pick the kind and its parameters.
+        kind (str, optional): See `choose_index_kind`. Defaults to VECTOR_INDEX.
+
+    Returns:
+        faiss.Index: The empty index.
+    """
+    kind = choose_index_kind(size, kind)
+    if kind == "l2":
+        return faiss.IndexFlatL2(dim)
+    if kind == "flat":
+        return faiss.IndexFlatIP(dim)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    if kind == "ivfpq":
+        nlist = ivf_lists(size)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_subquantizers(dim), PQ_BITS, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = min(nlist, max(8, nlist // 16))
+        return index
+    raise ValueError(f"Unknown vector index kind: {kind}")
+
+
+def build_vector_index(vectors: np.ndarray, kind: str = VECTOR_INDEX, name: str = "index"):
+    """
+    Build a FAISS index over a matrix of vectors and record its build time and recall.
+
+    Args:
+        vectors (np.ndarray): One vector per row. Normalized here for cosine indices.
+        kind (str, optional): See `choose_index_kind`. Defaults to VECTOR_INDEX.
+        name (str, optional): Name of the index in `index_reports`. Defaults to "index".
+
+    Returns:
+        faiss.Index: The index, holding the vectors in row order.
+    """
+    vectors = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    start = time.perf_counter()
+    index = new_vector_index(vectors.shape[1], len(vectors), kind)
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        vectors = normalized(vectors)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    report_index(name, index, vectors, time.perf_counter() - start)
+    return index
+
+
+def report_index(name: str, index, vectors: np.ndarray, build_seconds: float) -> Dict:
+    """
+    Record the build time and recall of an index in `index_reports`.
+
+    Recall is the mean fraction of the exact top RECALL_K neighbours, by the index's own
+    metric, found by the index for a sample of up to RECALL_SAMPLE of the indexed vectors.
+    Exact (flat) indices have a recall of 1 by definition and are not measured.
+
+    Args:
+        name (str): Name of the index.
+        index (faiss.Index): The index.
+        vectors (np.ndarray): The vectors held by the index, in insertion order.
+        build_seconds (float): Wall time of the build.
+
+    Returns:
+        Dict: The report.
+    """
+    recall = 1.0
+    if not isinstance(index, (faiss.IndexFlatIP, faiss.IndexFlatL2)) and len(vectors):
+        recall = measure_recall(index, vectors)
+    report = {
+        "name": name,
+        "index": type(index).__name__,
+        "size": int(index.ntotal),
+        "dim": int(index.d),
+        "build_seconds": round(build_seconds, 4),
+        f"recall_at_{RECALL_K}": round(recall, 4),
+        "created_at": time.time(),
+    }
+    with _reports_lock:
+        index_reports.append(report)
+    return report
+
+
+def measure_recall(index, vectors: np.ndarray, k: int = RECALL_K, sample: int = RECALL_SAMPLE) -> float:
+    """
+    Return the recall@k of an index against an exact search over the same vectors.
+    """
+    vectors = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    k = min(k, len(vectors))
+    queries = vectors[np.linspace(0, len(vectors) - 1, min(sample, len(vectors))).astype(np.int64)]
+
+    exact = faiss.IndexFlat(vectors.shape[1], index.metric_type)
+    exact.add(vectors)
+    _, expected = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    hits = sum(len(set(e) & set(f)) for e, f in zip(expected.tolist(), found.tolist()))
+    return hits / float(k * len(queries))
+
+
+def search_vector_index(index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search an index built by `build_vector_index`, or any FAISS index.
+
+    Queries are normalized for cosine indices, and their inner product scores are turned
+    into cosine distances (1 - similarity), so the distances of every kind of index
+    grow with dissimilarity.
+
+    Args:
+        index (faiss.Index): The index.
+        queries (np.ndarray): One query vector per row.
+        k (int): Number of neighbours per query.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Distances and ids, one row per query, -1 ids for missing neighbours.
+                                       Distances are 1 - cosine similarity for inner product
+                                       indices and squared L2 distances for L2 indices.
+    """
+    queries = np.array(queries, dtype=np.float32, order="C", ndmin=2)
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        return index.search(queries, k)
+    scores, ids = index.search(normalized(queries), k)
+    return 1.0 - scores, ids
+
+
+def index_stats() -> List[Dict]:
+    """Return the reports of the latest indices built, newest last."""
+    with _reports_lock:
+        return list(index_reports)